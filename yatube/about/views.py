@@ -1,9 +1,13 @@
 from django.views.generic.base import TemplateView
 
+from core.replicas import replica_reads
 
+
+@replica_reads
 class AboutAuthorView(TemplateView):
     template_name = 'about/author.html'
 
 
+@replica_reads
 class AboutTechView(TemplateView):
     template_name = 'about/tech.html'
@@ -0,0 +1,172 @@
+import random
+import time
+from contextlib import ExitStack
+from datetime import timedelta
+from http import HTTPStatus
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.test import Client
+from django.urls import URLPattern, get_resolver, reverse
+from django.utils import timezone
+from mixer.backend.django import mixer
+
+from posts.bulk import keep_post_dates
+from posts.models import Group, Post, User
+
+from .queries import QueryCounter
+
+URLCONFS = ('posts.urls', 'users.urls', 'about.urls')
+TEXT_POOL_SIZE = 1000
+SEED_BATCH_SIZE = 1000
+PERCENTILES = (50, 90, 99)
+
+
+def seed_dataset(users, groups, posts, seed=0):
+    """Заполняет базу воспроизводимым набором данных: при одном и том
+    же seed получаются те же пользователи, группы и тексты постов."""
+    rng = random.Random(seed)
+    mixer.faker.seed_instance(seed)
+    authors = mixer.cycle(users).blend(
+        User, username=mixer.sequence('bench_user_{0}'))
+    author = authors[0]
+    author.is_staff = True
+    author.save(update_fields=('is_staff',))
+    group_list = mixer.cycle(groups).blend(
+        Group, slug=mixer.sequence('bench-group-{0}'))
+    texts = [mixer.faker.paragraph(nb_sentences=rng.randint(1, 8))
+             for _ in range(TEXT_POOL_SIZE)]
+    started = timezone.now() - timedelta(days=365)
+    step = timedelta(days=365) / max(posts, 1)
+    with keep_post_dates():
+        for offset in range(0, posts, SEED_BATCH_SIZE):
+            batch = []
+            for number in range(offset, min(offset + SEED_BATCH_SIZE, posts)):
+                pub_date = started + step * number
+                post = Post(
+                    text=rng.choice(texts),
+                    author=rng.choice(authors),
+                    group=rng.choice(group_list + [None]),
+                    pub_date=pub_date,
+                    updated=pub_date,
+                )
+                post.render_text()
+                batch.append(post)
+            Post.objects.bulk_create(batch)
+    return author
+
+
+def collect_urls(author):
+    """Все адреса из URLCONFS с подставленными аргументами и несколько
+    вариантов с параметрами запроса для лент и поиска."""
+    post = author.posts.latest('pub_date')
+    search = post.text.split()[0].strip('.')
+    group = Group.objects.filter(posts_count__gt=0).first()
+    values = {
+        'slug': group.slug,
+        'username': author.username,
+        'post_id': post.pk,
+    }
+    urls = []
+    for urlconf in URLCONFS:
+        resolver = get_resolver(urlconf)
+        namespace = getattr(resolver.urlconf_module, 'app_name', None)
+        for pattern in resolver.url_patterns:
+            if not isinstance(pattern, URLPattern):
+                continue
+            name = f'{namespace}:{pattern.name}'
+            kwargs = {key: values[key] for key in pattern.pattern.converters}
+            urls.append((name, reverse(name, kwargs=kwargs)))
+    pages = Post.objects.count() // settings.QUANTITY_OF_POSTS + 1
+    urls.extend((
+        ('posts:main_page', reverse('posts:main_page') + '?page=2'),
+        ('posts:main_page', reverse('posts:main_page') + f'?page={pages}'),
+        ('posts:search', reverse('posts:search') + f'?q={search}'),
+    ))
+    return urls
+
+
+def percentile(values, share):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * share / 100))]
+
+
+def measure(client, url, repeat, user=None, cold=False):
+    """Делает один прогревочный и repeat замеряемых GET-запросов.
+    При cold перед каждым запросом очищается кеш, иначе анонимные
+    страницы замерялись бы только как попадания в кеш страниц.
+    Для адресов, которые принимают только POST, возвращает None."""
+    latencies = []
+    counter = None
+    for number in range(repeat + 1):
+        if user is not None:
+            client.force_login(user)
+        if cold:
+            cache.clear()
+        counter = QueryCounter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(counter))
+            started = time.perf_counter()
+            response = client.get(url)
+            if response.streaming:
+                size = sum(len(chunk) for chunk in response.streaming_content)
+            else:
+                size = len(response.content)
+            elapsed = time.perf_counter() - started
+        if response.status_code == HTTPStatus.METHOD_NOT_ALLOWED:
+            return None
+        if number:
+            latencies.append(elapsed * 1000)
+    result = {f'p{share}': round(percentile(latencies, share), 3)
+              for share in PERCENTILES}
+    result.update(status=response.status_code, queries=counter.count,
+                  bytes=size)
+    return result
+
+
+def run_benchmark(author, repeat):
+    results = {}
+    urls = collect_urls(author)
+    post_only = set()
+    # Сначала авторизованный клиент: анонимного адреса только для POST
+    # отправляют на вход раньше, чем ответят 405.
+    for label, user in (('auth', author), ('anon', None)):
+        client = Client()
+        for name, url in urls:
+            if url in post_only:
+                continue
+            for state, cold in (('cold', True), ('warm', False)):
+                result = measure(client, url, repeat, user, cold)
+                if result is None:
+                    post_only.add(url)
+                    break
+                results[f'{label} {state} {url}'] = dict(result, name=name)
+    return results
+
+
+def compare(baseline, results, threshold):
+    """Строки отчёта: изменение p50, числа запросов и размера ответа
+    относительно базовой линии. Рост p50 больше threshold процентов
+    и любой рост числа запросов отмечаются как регресс."""
+    lines = []
+    for key, result in results.items():
+        old = baseline.get(key)
+        if old is None:
+            lines.append(f'  новый  {key}: p50 {result["p50"]:.1f} мс, '
+                         f'запросов {result["queries"]}')
+            continue
+        change = (result['p50'] - old['p50']) / (old['p50'] or 1) * 100
+        regression = (change > threshold
+                      or result['queries'] > old['queries'])
+        lines.append(
+            f'{"!" if regression else " "} {key}: '
+            f'p50 {old["p50"]:.1f} -> {result["p50"]:.1f} мс '
+            f'({change:+.0f}%), '
+            f'запросов {old["queries"]} -> {result["queries"]}, '
+            f'байт {old["bytes"]} -> {result["bytes"]}'
+        )
+    for key in baseline.keys() - results.keys():
+        lines.append(f'  пропал {key}')
+    return lines
@@ -0,0 +1,128 @@
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections
+from django.test.utils import override_settings
+
+from posts.models import Post, User
+from posts.utils import QUANTITY_OF_POSTS, get_index_posts
+
+BASELINE_PRAGMAS = {'journal_mode': 'DELETE', 'synchronous': 'FULL'}
+
+
+def read_feed():
+    posts = get_index_posts()[:QUANTITY_OF_POSTS]
+    return [(post.author.username, post.excerpt) for post in posts]
+
+
+def write_post(author_id):
+    Post.objects.create(author_id=author_id, text='Пост из бенчмарка')
+
+
+def run_worker(role, deadline, author_id):
+    """Выполняет чтение ленты или создание постов до deadline,
+    возвращает роль, число операций, ошибок блокировки и задержки."""
+    connections.close_all()
+    operations = errors = 0
+    latencies = []
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        try:
+            if role == 'read':
+                read_feed()
+            else:
+                write_post(author_id)
+        except OperationalError:
+            errors += 1
+            continue
+        latencies.append(time.perf_counter() - started)
+        operations += 1
+    connections.close_all()
+    return role, operations, errors, latencies
+
+
+def percentile(values, share):
+    if not values:
+        return 0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+class Command(BaseCommand):
+    help = ('Измеряет пропускную способность чтения ленты из нескольких '
+            'процессов во время записи постов: без настроек SQLite '
+            'и с SQLITE_PRAGMAS')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--writers', type=int, default=1)
+        parser.add_argument('--duration', type=float, default=5)
+        parser.add_argument('--posts', type=int, default=10000)
+
+    def handle(self, *args, **options):
+        modes = (
+            ('без настроек', BASELINE_PRAGMAS),
+            ('SQLITE_PRAGMAS', settings.SQLITE_PRAGMAS),
+        )
+        original_name = connections[DEFAULT_DB_ALIAS].settings_dict['NAME']
+        workdir = tempfile.mkdtemp()
+        try:
+            template = os.path.join(workdir, 'template.sqlite3')
+            with override_settings(SQLITE_PRAGMAS=BASELINE_PRAGMAS):
+                self.use_database(template)
+                self.seed(options['posts'])
+            for number, (title, pragmas) in enumerate(modes):
+                path = os.path.join(workdir, f'{number}.sqlite3')
+                shutil.copy(template, path)
+                self.use_database(path)
+                with override_settings(SQLITE_PRAGMAS=pragmas):
+                    self.report(title, self.run(options), options['duration'])
+        finally:
+            self.use_database(original_name)
+            shutil.rmtree(workdir)
+
+    def use_database(self, path):
+        connections.close_all()
+        connections[DEFAULT_DB_ALIAS].settings_dict['NAME'] = path
+
+    def seed(self, count):
+        call_command('migrate', verbosity=0)
+        author = User.objects.create_user(username='bench_author')
+        Post.objects.bulk_create(
+            Post(author=author, text=f'Пост {number}',
+                 excerpt=f'Пост {number}')
+            for number in range(count)
+        )
+        connections.close_all()
+
+    def run(self, options):
+        author_id = User.objects.get(username='bench_author').pk
+        connections.close_all()
+        deadline = time.perf_counter() + options['duration']
+        roles = (['read'] * options['readers']
+                 + ['write'] * options['writers'])
+        context = multiprocessing.get_context('fork')
+        with context.Pool(len(roles)) as pool:
+            return pool.starmap(
+                run_worker, [(role, deadline, author_id) for role in roles])
+
+    def report(self, title, results, duration):
+        for role in ('read', 'write'):
+            operations = errors = 0
+            latencies = []
+            for name, role_operations, role_errors, values in results:
+                if name == role:
+                    operations += role_operations
+                    errors += role_errors
+                    latencies.extend(values)
+            self.stdout.write(
+                f'{title}, {role}: {operations / duration:.0f} оп/с, '
+                f'p95 {percentile(latencies, 0.95) * 1000:.1f} мс, '
+                f'ошибок блокировки {errors}'
+            )
@@ -0,0 +1,79 @@
+import json
+import os
+import platform
+
+import django
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.test.utils import (
+    setup_databases, setup_test_environment, teardown_databases,
+    teardown_test_environment
+)
+
+from core.benchmark import compare, run_benchmark, seed_dataset
+from posts.lookups import existence
+
+
+class Command(BaseCommand):
+    help = ('Заполняет тестовую базу и замеряет все адреса posts, users '
+            'и about: задержку, число запросов и размер ответа. Сравнивает '
+            'результат с базовой линией в JSON')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--groups', type=int, default=10)
+        parser.add_argument('--posts', type=int, default=10000)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--threshold', type=float, default=10,
+                            help='Допустимый рост p50, в процентах')
+        parser.add_argument(
+            '--baseline',
+            default=os.path.join(settings.BASE_DIR, 'bench_baseline.json'))
+        parser.add_argument('--save', action='store_true',
+                            help='Записать результат как базовую линию')
+
+    def handle(self, *args, **options):
+        meta = {
+            key: options[key]
+            for key in ('users', 'groups', 'posts', 'seed', 'repeat')
+        }
+        meta.update(python=platform.python_version(),
+                    django=django.get_version())
+        setup_test_environment()
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            cache.clear()
+            author = seed_dataset(options['users'], options['groups'],
+                                  options['posts'], options['seed'])
+            # На сервере индекс строит фоновый поток при старте.
+            existence.rebuild()
+            results = run_benchmark(author, options['repeat'])
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+        for key, result in results.items():
+            self.stdout.write(
+                f'{result["status"]} {key}: p50 {result["p50"]:.1f} мс, '
+                f'p90 {result["p90"]:.1f} мс, p99 {result["p99"]:.1f} мс, '
+                f'запросов {result["queries"]}, байт {result["bytes"]}'
+            )
+        path = options['baseline']
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as baseline:
+                baseline = json.load(baseline)
+            if baseline['meta'] != meta:
+                self.stderr.write(
+                    f'Базовая линия снята с другими параметрами: '
+                    f'{baseline["meta"]}')
+            self.stdout.write(f'Сравнение с {path}:')
+            for line in compare(baseline['results'], results,
+                                options['threshold']):
+                self.stdout.write(line)
+        if options['save']:
+            with open(path, 'w', encoding='utf-8') as baseline:
+                json.dump({'meta': meta, 'results': results}, baseline,
+                          ensure_ascii=False, indent=2, sort_keys=True)
+            self.stdout.write(self.style.SUCCESS(
+                f'Базовая линия записана в {path}'))
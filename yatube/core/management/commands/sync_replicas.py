@@ -0,0 +1,19 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+class Command(BaseCommand):
+    help = 'Копирует основную базу SQLite в файлы реплик'
+
+    def handle(self, *args, **options):
+        source = connections[DEFAULT_DB_ALIAS]
+        if source.vendor != 'sqlite':
+            raise CommandError('Копирование поддерживается только для SQLite')
+        source.ensure_connection()
+        for alias in settings.REPLICA_DATABASES:
+            target = connections[alias]
+            target.ensure_connection()
+            source.connection.backup(target.connection)
+            self.stdout.write(self.style.SUCCESS(
+                f'Реплика {alias} обновлена'))
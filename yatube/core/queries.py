@@ -0,0 +1,66 @@
+import logging
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+BUDGET_HEADER = 'X-Query-Budget'
+
+
+class QueryCounter:
+    """Обёртка execute_wrapper: считает запросы по тексту SQL
+    без параметров, поэтому N+1 виден как один повторяющийся шаблон."""
+
+    def __init__(self):
+        self.queries = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries[sql] += 1
+        return execute(sql, params, many, context)
+
+    @property
+    def count(self):
+        return sum(self.queries.values())
+
+    def duplicates(self, threshold):
+        return {sql: count for sql, count in self.queries.items()
+                if count >= threshold}
+
+
+def get_query_budget(request):
+    match = request.resolver_match
+    if match is None:
+        return None
+    return settings.QUERY_BUDGETS.get(match.view_name)
+
+
+class QueryBudgetMiddleware:
+    """Считает запросы к базе за время запроса, пишет в лог повторы
+    и превышение бюджета из QUERY_BUDGETS, при превышении добавляет
+    заголовок X-Query-Budget."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        counter = QueryCounter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(counter))
+            response = self.get_response(request)
+        budget = get_query_budget(request)
+        duplicates = counter.duplicates(settings.QUERY_DUPLICATE_THRESHOLD)
+        response.query_count = counter.count
+        response.query_budget = budget
+        response.duplicate_queries = duplicates
+        for sql, count in duplicates.items():
+            logger.warning('%s: запрос выполнен %d раз: %s',
+                           request.path, count, sql)
+        if budget is not None and counter.count > budget:
+            logger.warning('%s: %d запросов при бюджете %d',
+                           request.path, counter.count, budget)
+            response[BUDGET_HEADER] = f'{counter.count}/{budget}'
+        return response
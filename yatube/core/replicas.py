@@ -0,0 +1,81 @@
+import random
+import threading
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+PIN_COOKIE = 'primary_pin'
+
+# Сессии и пользователи нужны до выбора реплики и должны видеть
+# только что созданные записи, поэтому всегда читаются с основной базы.
+PRIMARY_APPS = {'sessions', 'auth', 'contenttypes'}
+
+_state = threading.local()
+
+
+def replica_reads(view):
+    """Помечает представление, GET-запросы которого можно читать
+    с реплики. Подходит и для функций, и для классов."""
+    view.replica_reads = True
+    return view
+
+
+def reading_replica():
+    """Читает ли текущий запрос с реплики."""
+    return getattr(_state, 'replica', None) is not None
+
+
+def choose_replica(request, view_func):
+    view = getattr(view_func, 'view_class', view_func)
+    if (not settings.REPLICA_DATABASES
+            or not getattr(view, 'replica_reads', False)
+            or request.method not in ('GET', 'HEAD')
+            or PIN_COOKIE in request.COOKIES):
+        return None
+    return random.choice(settings.REPLICA_DATABASES)
+
+
+class ReplicaRouter:
+    """Читает с реплики только внутри помеченных представлений,
+    все записи, сессии, пользователи и остальное чтение идут
+    в основную базу."""
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label in PRIMARY_APPS:
+            return DEFAULT_DB_ALIAS
+        return getattr(_state, 'replica', None) or DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        _state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        return db not in settings.REPLICA_DATABASES
+
+
+class ReplicaMiddleware:
+    """Выбирает реплику для запроса и закрепляет пользователя
+    за основной базой на REPLICA_LAG секунд после его записи."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        _state.replica = None
+        _state.wrote = False
+        try:
+            response = self.get_response(request)
+        finally:
+            wrote = _state.wrote
+            _state.replica = None
+            _state.wrote = False
+        if wrote:
+            response.set_cookie(PIN_COOKIE, '1', max_age=settings.REPLICA_LAG,
+                                httponly=True)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        _state.replica = choose_replica(request, view_func)
@@ -0,0 +1,34 @@
+import logging
+from contextlib import contextmanager
+
+
+def assert_query_budget(response):
+    """Проверяет в тестах, что запрос уложился в бюджет из QUERY_BUDGETS
+    и не повторял один и тот же SQL. Подходит для pytest и unittest."""
+    path = response.wsgi_request.path
+    assert not response.duplicate_queries, (
+        f'{path}: повторяющиеся запросы, похоже на N+1: '
+        f'{response.duplicate_queries}')
+    assert response.query_budget is not None, (
+        f'{path}: не задан бюджет в QUERY_BUDGETS')
+    assert response.query_count <= response.query_budget, (
+        f'{path}: {response.query_count} запросов '
+        f'при бюджете {response.query_budget}')
+
+
+@contextmanager
+def assert_no_query_warnings():
+    """Падает, если внутри блока QueryBudgetMiddleware написал в лог
+    о превышении бюджета или повторах: в тестах консоль молчит, и без
+    этой проверки регрессия прошла бы незамеченной."""
+    records = []
+    handler = logging.Handler(logging.WARNING)
+    handler.emit = records.append
+    logger = logging.getLogger('core.queries')
+    logger.addHandler(handler)
+    try:
+        yield
+    finally:
+        logger.removeHandler(handler)
+    assert not records, '\n'.join(
+        record.getMessage() for record in records)
@@ -0,0 +1,44 @@
+from django.test import TestCase
+
+from posts.models import Group, Post
+
+from ..benchmark import collect_urls, compare, run_benchmark, seed_dataset
+
+
+class BenchmarkTests(TestCase):
+
+    def test_seed_and_collect_urls(self):
+        """Набор данных создаётся, адреса собираются из всех urls.py."""
+        author = seed_dataset(users=3, groups=2, posts=30)
+        self.assertEqual(Post.objects.count(), 30)
+        self.assertEqual(Group.objects.count(), 2)
+        names = {name for name, _ in collect_urls(author)}
+        for name in ('posts:main_page', 'posts:post_edit', 'users:signup',
+                     'about:tech'):
+            self.assertIn(name, names)
+
+    def test_run_reports_cold_and_warm(self):
+        """Каждый адрес замеряется с пустым и прогретым кешем, адреса
+        только для POST пропускаются."""
+        author = seed_dataset(users=3, groups=2, posts=30)
+        results = run_benchmark(author, repeat=1)
+        self.assertGreater(results['anon cold /']['queries'], 0)
+        self.assertEqual(results['anon warm /']['queries'], 0)
+        self.assertFalse([key for key, result in results.items()
+                          if result['status'] == 405])
+        self.assertFalse([key for key in results if 'follow/' in key
+                          and not key.endswith(' /follow/')])
+
+    def test_compare_marks_regressions(self):
+        """Рост числа запросов и p50 выше порога отмечается «!»."""
+        baseline = {
+            'auth /': {'p50': 10, 'queries': 3, 'bytes': 100},
+            'auth /feed/': {'p50': 10, 'queries': 1, 'bytes': 100},
+        }
+        results = {
+            'auth /': {'p50': 10.5, 'queries': 4, 'bytes': 100},
+            'auth /feed/': {'p50': 10.5, 'queries': 1, 'bytes': 100},
+        }
+        lines = compare(baseline, results, threshold=10)
+        self.assertTrue(lines[0].startswith('!'))
+        self.assertTrue(lines[1].startswith(' '))
@@ -0,0 +1,123 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Group, Post, User
+
+from ..queries import BUDGET_HEADER, QueryCounter
+from ..testing import assert_no_query_warnings, assert_query_budget
+
+
+class QueryBudgetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='random_name',
+                                            first_name='Лев',
+                                            last_name='Толстой')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_group',
+            description='Тестовое описание группы',
+        )
+        for number in range(15):
+            Post.objects.create(author=cls.user, group=cls.group,
+                                text=f'Тестовый пост {number}')
+        cls.post = Post.objects.first()
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_pages_within_budget(self):
+        """Страницы укладываются в бюджет запросов без N+1."""
+        urls = (
+            reverse('posts:main_page'),
+            reverse('posts:feed'),
+            reverse('posts:group_list', args=(self.group.slug,)),
+            reverse('posts:group_feed', args=(self.group.slug,)),
+            reverse('posts:profile', args=(self.user.username,)),
+            reverse('posts:profile_feed', args=(self.user.username,)),
+            reverse('posts:post_detail', args=(self.post.pk,)),
+            reverse('posts:search') + '?q=пост',
+            reverse('posts:follow_index'),
+            reverse('posts:post_create'),
+            reverse('posts:post_edit', args=(self.post.pk,)),
+            reverse('about:author'),
+            reverse('about:tech'),
+        )
+        for url in urls:
+            for client in (self.client, self.authorized_client):
+                with self.subTest(url=url), assert_no_query_warnings():
+                    cache.clear()
+                    assert_query_budget(client.get(url))
+
+    def test_follow_state_within_budget(self):
+        """Чужой профиль и группа с кнопкой подписки укладываются
+        в бюджет."""
+        reader = Client()
+        reader.force_login(User.objects.create_user(username='reader'))
+        urls = (
+            reverse('posts:group_list', args=(self.group.slug,)),
+            reverse('posts:profile', args=(self.user.username,)),
+        )
+        for url in urls:
+            with self.subTest(url=url), assert_no_query_warnings():
+                cache.clear()
+                response = reader.get(url)
+                assert_query_budget(response)
+                self.assertIn('following', response.context)
+
+    def test_form_submissions_within_budget(self):
+        """Создание и правка поста, подписки и отписки укладываются
+        в бюджет."""
+        author = User.objects.create_user(username='author')
+        Post.objects.create(author=author, text='Пост автора')
+        follow_urls = (
+            reverse('posts:profile_follow', args=(author.username,)),
+            reverse('posts:profile_unfollow', args=(author.username,)),
+            reverse('posts:group_follow', args=(self.group.slug,)),
+            reverse('posts:group_unfollow', args=(self.group.slug,)),
+        )
+        with assert_no_query_warnings():
+            responses = (
+                *(self.authorized_client.post(url) for url in follow_urls),
+                self.authorized_client.post(
+                    reverse('posts:post_create'),
+                    data={'text': 'Новый пост', 'group': self.group.pk}),
+                self.authorized_client.post(
+                    reverse('posts:post_edit', args=(self.post.pk,)),
+                    data={'text': 'Исправленный пост'}),
+            )
+        for response in responses:
+            assert_query_budget(response)
+
+    def test_no_warnings_fails_on_overrun(self):
+        """Предупреждение о превышении бюджета роняет проверку."""
+        with override_settings(QUERY_BUDGETS={'posts:main_page': 1}):
+            with self.assertRaises(AssertionError):
+                with assert_no_query_warnings():
+                    self.authorized_client.get(reverse('posts:main_page'))
+        with assert_no_query_warnings():
+            self.authorized_client.get(reverse('posts:main_page'))
+
+    @override_settings(QUERY_BUDGETS={'posts:main_page': 1})
+    def test_over_budget_sets_header(self):
+        """Превышение бюджета отмечается заголовком и ловится
+        проверкой в тестах."""
+        response = self.authorized_client.get(reverse('posts:main_page'))
+        self.assertEqual(response[BUDGET_HEADER],
+                         f'{response.query_count}/1')
+        with self.assertRaises(AssertionError):
+            assert_query_budget(response)
+
+    def test_counter_finds_repeated_queries(self):
+        """Один и тот же SQL в цикле считается повтором."""
+        counter = QueryCounter()
+        with connection.execute_wrapper(counter):
+            for post in Post.objects.all()[:5]:
+                User.objects.get(pk=post.author_id)
+        self.assertEqual(counter.count, 6)
+        self.assertEqual(list(counter.duplicates(3).values()), [5])
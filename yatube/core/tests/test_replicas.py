@@ -0,0 +1,108 @@
+from django.core.cache import cache
+from django.db import connections
+from django.test import Client, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.cache import feed_changed_key, index_feed
+from posts.models import Post, User
+
+from ..replicas import PIN_COOKIE
+
+
+@override_settings(REPLICA_DATABASES=('replica',))
+class ReplicaRoutingTests(TransactionTestCase):
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='random_name')
+        self.post = Post.objects.create(author=self.user, text='Тестовый пост')
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        cache.clear()
+
+    def count_queries(self, client, method, url, data=None):
+        with CaptureQueriesContext(connections['default']) as primary, \
+                CaptureQueriesContext(connections['replica']) as replica:
+            response = getattr(client, method)(url, data)
+        return response, len(primary), len(replica)
+
+    def post_queries(self, client, url):
+        """Запросы к основной базе и реплике без чтения сессии
+        и пользователя, которые всегда идут в основную базу."""
+        with CaptureQueriesContext(connections['default']) as primary, \
+                CaptureQueriesContext(connections['replica']) as replica:
+            response = client.get(url)
+        return response, [
+            [query['sql'] for query in queries
+             if 'FROM "django_session"' not in query['sql']
+             and 'FROM "auth_user"' not in query['sql']]
+            for queries in (primary, replica)
+        ]
+
+    def test_read_views_use_replica(self):
+        """Ленты и страница поста читаются с реплики."""
+        urls = (
+            reverse('posts:main_page'),
+            reverse('posts:profile', args=(self.user.username,)),
+            reverse('posts:post_detail', args=(self.post.pk,)),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                cache.clear()
+                response, (primary, replica) = self.post_queries(
+                    self.authorized_client, url)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(primary, [])
+                self.assertTrue(replica)
+
+    def test_session_is_read_from_primary(self):
+        """Без закрепления за основной базой вошедший пользователь
+        остаётся вошедшим: сессия и пользователь читаются не с реплики."""
+        for url in (reverse('about:tech'), reverse('posts:follow_index')):
+            with self.subTest(url=url):
+                with CaptureQueriesContext(connections['replica']) as replica:
+                    response = self.authorized_client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.context['user'], self.user)
+                self.assertFalse([
+                    query for query in replica
+                    if 'FROM "django_session"' in query['sql']
+                    or 'FROM "auth_user"' in query['sql']
+                ])
+
+    def test_other_views_use_primary(self):
+        """Форма создания поста читает с основной базы."""
+        _, primary, replica = self.count_queries(
+            self.authorized_client, 'get', reverse('posts:post_create'))
+        self.assertGreater(primary, 0)
+        self.assertEqual(replica, 0)
+
+    def test_writer_reads_own_writes_from_primary(self):
+        """После записи автор читает с основной базы."""
+        response = self.authorized_client.post(
+            reverse('posts:post_create'), data={'text': 'Новый пост'})
+        self.assertIn(PIN_COOKIE, response.cookies)
+        cache.clear()
+        response, primary, replica = self.count_queries(
+            self.authorized_client, 'get', reverse('posts:main_page'))
+        self.assertContains(response, 'Новый пост')
+        self.assertEqual(replica, 0)
+
+    def test_recent_write_is_not_cached_from_replica(self):
+        """Другие пользователи читают с реплики и после чужой записи,
+        но страница, прочитанная сразу после изменения ленты, не попадает
+        в кеш и не получает ETag."""
+        Post.objects.create(author=self.user, text='Новый пост')
+        url = reverse('posts:main_page')
+        for _ in range(2):
+            response, primary, replica = self.count_queries(
+                Client(), 'get', url)
+            self.assertEqual(primary, 0)
+            self.assertGreater(replica, 0)
+            self.assertFalse(response.has_header('ETag'))
+        cache.delete(feed_changed_key(index_feed()))
+        response, _, replica = self.count_queries(Client(), 'get', url)
+        self.assertTrue(response.has_header('ETag'))
+        _, _, replica = self.count_queries(Client(), 'get', url)
+        self.assertEqual(replica, 0)
@@ -0,0 +1,24 @@
+from django.db import connection
+from django.test import TestCase, override_settings
+
+from ..sqlite import apply_pragmas
+
+
+class SqlitePragmasTests(TestCase):
+
+    def get_pragma(self, name):
+        return connection.connection.execute(f'PRAGMA {name}').fetchone()[0]
+
+    def test_new_connection_is_tuned(self):
+        """Новое соединение получает настройки из SQLITE_PRAGMAS."""
+        self.assertEqual(self.get_pragma('synchronous'), 1)
+        self.assertEqual(self.get_pragma('cache_size'), -64 * 1024)
+        self.assertEqual(self.get_pragma('busy_timeout'), 20000)
+
+    @override_settings(SQLITE_PRAGMAS={'cache_size': -1024})
+    def test_pragmas_come_from_settings(self):
+        """Список PRAGMA берётся из настроек."""
+        apply_pragmas(sender=None, connection=connection)
+        self.assertEqual(self.get_pragma('cache_size'), -1024)
+        with self.settings(SQLITE_PRAGMAS={'cache_size': -64 * 1024}):
+            apply_pragmas(sender=None, connection=connection)
@@ -0,0 +1,35 @@
+import re
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from posts.models import Post, User
+
+METRIC = re.compile(r'(\w+);dur=([\d.]+)(?:;desc="(\d+) queries")?')
+
+
+class ServerTimingTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='random_name')
+        Post.objects.create(author=cls.user, text='Тестовый пост')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_server_timing_header(self):
+        """Ответ содержит время запроса, представления, SQL и шаблонов."""
+        with self.assertLogs('core.timing', 'INFO') as logs:
+            response = self.client.get(reverse('posts:main_page'))
+        metrics = {name: (float(duration), queries)
+                   for name, duration, queries
+                   in METRIC.findall(response['Server-Timing'])}
+        self.assertEqual(set(metrics), {'total', 'mw', 'view', 'db', 'tpl'})
+        self.assertEqual(metrics['db'][1], str(response.query_count))
+        self.assertGreater(metrics['tpl'][0], 0)
+        self.assertLessEqual(metrics['view'][0], metrics['total'][0])
+        self.assertIn(f'path=/ method=GET status=200 '
+                      f'queries={response.query_count} total=',
+                      logs.output[0])
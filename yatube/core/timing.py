@@ -0,0 +1,136 @@
+import logging
+import threading
+import time
+from contextlib import ExitStack
+
+from django.db import connections
+from django.template.backends.django import DjangoTemplates, Template
+
+logger = logging.getLogger(__name__)
+
+_state = threading.local()
+
+
+class RequestTimings:
+    """Время запроса по частям, в секундах. Сам служит обёрткой
+    execute_wrapper для подсчёта SQL."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.sql = 0.0
+        self.queries = 0
+        self.template = 0.0
+        self.view = 0.0
+        self.rendering = False
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql += time.perf_counter() - started
+            self.queries += 1
+
+    def metrics(self):
+        total = time.perf_counter() - self.started
+        return (
+            ('total', total, None),
+            ('mw', total - self.view, None),
+            ('view', self.view, None),
+            ('db', self.sql, f'{self.queries} queries'),
+            ('tpl', self.template, None),
+        )
+
+
+def get_timings():
+    return getattr(_state, 'timings', None)
+
+
+def format_server_timing(metrics):
+    entries = []
+    for name, duration, description in metrics:
+        entry = f'{name};dur={duration * 1000:.1f}'
+        if description:
+            entry += f';desc="{description}"'
+        entries.append(entry)
+    return ', '.join(entries)
+
+
+class TimedTemplate(Template):
+    """Шаблон, который засчитывает время рендеринга в текущий запрос.
+    Запросы к базе, выполненные из шаблона, вычитаются: они уже
+    попали в db. Вложенные include не учитываются повторно."""
+
+    def render(self, context=None, request=None):
+        timings = get_timings()
+        if timings is None or timings.rendering:
+            return super().render(context, request)
+        timings.rendering = True
+        sql = timings.sql
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            timings.template += (time.perf_counter() - started
+                                 - (timings.sql - sql))
+            timings.rendering = False
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """Бэкенд DjangoTemplates с замером времени рендеринга."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code).template, self)
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name).template,
+                             self)
+
+
+class ServerTimingMiddleware:
+    """Первый в MIDDLEWARE: измеряет весь запрос, отдаёт заголовок
+    Server-Timing и пишет ту же разбивку строкой в лог."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timings = _state.timings = RequestTimings()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(timings))
+                response = self.get_response(request)
+        finally:
+            _state.timings = None
+        metrics = timings.metrics()
+        header = format_server_timing(metrics)
+        if response.has_header('Server-Timing'):
+            header = f"{response['Server-Timing']}, {header}"
+        response['Server-Timing'] = header
+        logger.info(
+            'path=%s method=%s status=%d queries=%d %s',
+            request.path, request.method, response.status_code,
+            timings.queries,
+            ' '.join(f'{name}={duration * 1000:.1f}'
+                     for name, duration, _ in metrics),
+        )
+        return response
+
+
+class ViewTimingMiddleware:
+    """Последний в MIDDLEWARE: измеряет представление вместе
+    с рендерингом, остальное время запроса приходится на middleware."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timings = get_timings()
+        if timings is None:
+            return self.get_response(request)
+        started = time.perf_counter()
+        try:
+            return self.get_response(request)
+        finally:
+            timings.view += time.perf_counter() - started
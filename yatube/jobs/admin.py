@@ -0,0 +1,38 @@
+from django.contrib import admin
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import Job
+
+
+class JobAdmin(admin.ModelAdmin):
+
+    list_display = ('pk',
+                    'name',
+                    'status',
+                    'attempts',
+                    'run_at',
+                    'key',
+                    )
+    list_filter = ('status', 'name')
+    search_fields = ('key',)
+    readonly_fields = ('locked_by', 'locked_at', 'last_error', 'created')
+    actions = ('requeue',)
+
+    def requeue(self, request, queryset):
+        requeued = 0
+        for job in queryset.filter(status=Job.FAILED):
+            try:
+                with transaction.atomic():
+                    Job.objects.filter(pk=job.pk).update(
+                        status=Job.QUEUED, attempts=0,
+                        run_at=timezone.now())
+            except IntegrityError:
+                # Задача с тем же ключом уже ждёт в очереди.
+                continue
+            requeued += 1
+        self.message_user(request, f'Возвращено в очередь: {requeued}')
+    requeue.short_description = 'Вернуть в очередь'
+
+
+admin.site.register(Job, JobAdmin)
@@ -0,0 +1,75 @@
+import logging
+import signal
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, close_old_connections, connections
+
+from jobs.queue import Worker
+
+logger = logging.getLogger(__name__)
+
+
+def work(stop, burst, poll_interval, batch_size):
+    worker = Worker(batch_size)
+    try:
+        while not stop.is_set():
+            close_old_connections()
+            try:
+                if worker.run_once():
+                    continue
+            except DatabaseError:
+                # Занятую базу можно подождать, задачи, которые не
+                # удалось вернуть в очередь, вернёт requeue_stale.
+                logger.exception('Ошибка базы данных в исполнителе')
+                stop.wait(poll_interval)
+                continue
+            worker.requeue_stale()
+            if burst:
+                break
+            stop.wait(poll_interval)
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = ('Выполняет фоновые задачи из очереди в нескольких потоках '
+            'до остановки по Ctrl+C или SIGTERM')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int,
+                            default=settings.JOBS_WORKERS)
+        parser.add_argument('--batch-size', type=int,
+                            default=settings.JOBS_BATCH_SIZE)
+        parser.add_argument('--poll-interval', type=float,
+                            default=settings.JOBS_POLL_INTERVAL,
+                            help='Пауза в секундах, когда очередь пуста')
+        parser.add_argument('--burst', action='store_true',
+                            help='Выйти, когда готовые задачи кончатся')
+
+    def handle(self, *args, **options):
+        stop = threading.Event()
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGTERM, lambda *args: stop.set())
+        threads = [
+            threading.Thread(
+                target=work,
+                args=(stop, options['burst'], options['poll_interval'],
+                      options['batch_size']),
+                name=f'jobs-worker-{number}',
+            )
+            for number in range(options['workers'])
+        ]
+        for thread in threads:
+            thread.start()
+        self.stdout.write(f'Исполнителей: {len(threads)}')
+        try:
+            for thread in threads:
+                while thread.is_alive():
+                    thread.join(0.5)
+        except KeyboardInterrupt:
+            stop.set()
+            for thread in threads:
+                thread.join()
+        self.stdout.write(self.style.SUCCESS('Исполнители остановлены'))
@@ -0,0 +1,88 @@
+from django.db import models
+from django.utils import timezone
+
+
+class Job(models.Model):
+    """Задача в очереди. Выполненные задачи удаляются, в таблице
+    остаются ожидающие, выполняемые и исчерпавшие попытки."""
+
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (QUEUED, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (FAILED, 'Ошибка'),
+    )
+
+    name = models.CharField(
+        max_length=200,
+        verbose_name='Задача',
+    )
+    payload = models.TextField(
+        default='[]',
+        verbose_name='Аргументы в JSON',
+    )
+    key = models.CharField(
+        max_length=200,
+        blank=True,
+        null=True,
+        verbose_name='Ключ идемпотентности',
+    )
+    status = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default=QUEUED,
+        verbose_name='Состояние',
+    )
+    attempts = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Попыток',
+    )
+    run_at = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Выполнить не раньше',
+    )
+    locked_by = models.CharField(
+        max_length=64,
+        blank=True,
+        verbose_name='Метка исполнителя',
+    )
+    locked_at = models.DateTimeField(
+        blank=True,
+        null=True,
+        verbose_name='Взята в работу',
+    )
+    last_error = models.TextField(
+        blank=True,
+        verbose_name='Последняя ошибка',
+    )
+    created = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Поставлена',
+    )
+
+    class Meta:
+        ordering = ('run_at', 'id')
+        indexes = (
+            models.Index(
+                fields=('status', 'run_at', 'id'),
+                name='job_status_run_at_idx',
+            ),
+            models.Index(
+                fields=('locked_by',),
+                name='job_locked_by_idx',
+            ),
+        )
+        constraints = (
+            models.UniqueConstraint(
+                fields=('key',),
+                condition=models.Q(status='queued'),
+                name='job_unique_queued_key',
+            ),
+        )
+        verbose_name = 'Задача'
+        verbose_name_plural = 'Задачи'
+
+    def __str__(self) -> str:
+        return f'{self.name} #{self.pk}'
@@ -0,0 +1,188 @@
+"""Очередь фоновых задач в таблице базы данных, без внешнего брокера.
+
+Задача попадает в очередь в транзакции изменения, которое её вызвало,
+если это изменение выполняется в транзакции: тогда она не теряется
+при падении процесса и не появляется, если транзакция откатилась.
+Сохранение постов и подписок для этого само открывает транзакцию,
+в остальных местах её нужно открыть вызывающему.
+
+Исполнители (manage.py run_workers) берут задачи одним UPDATE: SQLite
+выполняет записи по очереди, и две задачи не достаются двум
+исполнителям. Задачу упавшего исполнителя выполнит другой, поэтому
+задачи должны быть идемпотентными.
+"""
+import json
+import logging
+import traceback
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+TASKS = {}
+
+
+class Task:
+    """Функция, которую можно выполнить в фоне.
+
+    Пакетная задача получает список аргументов всех взятых задач
+    этого типа и выполняет их в одной транзакции. Если пачка упала,
+    её задачи выполняются по одной, и повторяется только упавшая.
+    """
+
+    def __init__(self, func, batch=False, max_attempts=None,
+                 retry_delay=None):
+        self.func = func
+        self.name = f'{func.__module__}.{func.__name__}'
+        self.batch = batch
+        self.max_attempts = max_attempts or settings.JOBS_MAX_ATTEMPTS
+        self.retry_delay = (settings.JOBS_RETRY_DELAY if retry_delay is None
+                            else retry_delay)
+        self.__doc__ = func.__doc__
+
+    def __call__(self, *args):
+        return self.func(*args)
+
+    def run(self, payloads):
+        if self.batch:
+            self.func(payloads)
+        else:
+            for args in payloads:
+                self.func(*args)
+
+    def enqueue(self, *args, key=None, delay=0):
+        """Ставит задачу в очередь. Пока в очереди ждёт задача с тем
+        же key, новая не добавляется. При JOBS_EAGER выполняет сразу."""
+        if settings.JOBS_EAGER:
+            self.run([json.loads(json.dumps(args))])
+            return
+        Job.objects.bulk_create([Job(
+            name=self.name,
+            payload=json.dumps(args),
+            key=key,
+            run_at=timezone.now() + timedelta(seconds=delay),
+        )], ignore_conflicts=True)
+
+
+def task(batch=False, max_attempts=None, retry_delay=None):
+    def decorator(func):
+        registered = Task(func, batch, max_attempts, retry_delay)
+        TASKS[registered.name] = registered
+        return registered
+    return decorator
+
+
+def get_task(name):
+    """Задача по имени. Модуль незарегистрированной задачи
+    импортируется: декоратор task зарегистрирует её."""
+    if name not in TASKS:
+        try:
+            import_string(name)
+        except ImportError:
+            return None
+    return TASKS.get(name)
+
+
+class Worker:
+    """Берёт готовые задачи из очереди и выполняет их."""
+
+    def __init__(self, batch_size=None):
+        self.batch_size = batch_size or settings.JOBS_BATCH_SIZE
+
+    def claim(self):
+        """Помечает своей меткой самую раннюю готовую задачу, а если
+        она пакетная, то и до batch_size готовых задач того же типа."""
+        now = timezone.now()
+        ready = Job.objects.filter(status=Job.QUEUED, run_at__lte=now)
+        name = ready.values_list('name', flat=True).first()
+        if name is None:
+            return None, []
+        task = get_task(name)
+        limit = self.batch_size if task is not None and task.batch else 1
+        token = uuid.uuid4().hex
+        Job.objects.filter(
+            status=Job.QUEUED,
+            pk__in=ready.filter(name=name).values('pk')[:limit],
+        ).update(status=Job.RUNNING, locked_by=token, locked_at=now,
+                 attempts=F('attempts') + 1)
+        return task, list(Job.objects.filter(locked_by=token))
+
+    def run_once(self):
+        """Выполняет одну порцию задач, возвращает их число."""
+        task, jobs = self.claim()
+        if not jobs:
+            return 0
+        try:
+            if task is None:
+                raise LookupError(f'Неизвестная задача {jobs[0].name}')
+            self.execute(task, jobs)
+        except Exception:
+            if task is None or len(jobs) == 1:
+                logger.exception('Задача %s не выполнена', jobs[0].name)
+                self.retry(task, jobs, traceback.format_exc())
+                return len(jobs)
+            logger.warning('Пачка задач %s не выполнена, задачи '
+                           'выполняются по одной', jobs[0].name,
+                           exc_info=True)
+            for job in jobs:
+                try:
+                    self.execute(task, [job])
+                except Exception:
+                    logger.exception('Задача %s не выполнена', job.name)
+                    self.retry(task, [job], traceback.format_exc())
+        return len(jobs)
+
+    def execute(self, task, jobs):
+        # Изменения, сделанные задачей, фиксируются вместе
+        # с удалением её из очереди.
+        with transaction.atomic():
+            task.run([json.loads(job.payload) for job in jobs])
+            Job.objects.filter(pk__in=[job.pk for job in jobs]).delete()
+
+    def retry(self, task, jobs, error):
+        """Возвращает задачи в очередь с растущей задержкой или, когда
+        попытки кончились, оставляет их в состоянии ошибки."""
+        now = timezone.now()
+        for job in jobs:
+            job.last_error = error
+            job.locked_by = ''
+            if task is None or job.attempts >= task.max_attempts:
+                job.status = Job.FAILED
+            elif job.key and Job.objects.filter(
+                    key=job.key, status=Job.QUEUED).exists():
+                # Пока задача выполнялась, поставили такую же.
+                job.delete()
+                continue
+            else:
+                job.status = Job.QUEUED
+                job.run_at = now + timedelta(
+                    seconds=task.retry_delay * 2 ** (job.attempts - 1))
+            job.save(update_fields=('status', 'run_at', 'locked_by',
+                                    'last_error'))
+
+    def requeue_stale(self):
+        """Возвращает в очередь задачи исполнителей, которые упали,
+        не закончив их за JOBS_LOCK_TIMEOUT секунд."""
+        deadline = timezone.now() - timedelta(
+            seconds=settings.JOBS_LOCK_TIMEOUT)
+        for job in Job.objects.filter(status=Job.RUNNING,
+                                      locked_at__lt=deadline):
+            self.retry(get_task(job.name), [job],
+                       'Исполнитель не завершил задачу')
+
+    def run_pending(self):
+        """Выполняет все готовые задачи, возвращает их число."""
+        total = 0
+        done = self.run_once()
+        while done:
+            total += done
+            done = self.run_once()
+        return total
@@ -0,0 +1,143 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from ..models import Job
+from ..queue import Worker, task
+
+calls = []
+
+
+@task()
+def remember(value):
+    calls.append(value)
+
+
+@task(batch=True)
+def remember_batch(payloads):
+    calls.append([value for value, in payloads])
+
+
+@task(max_attempts=2, retry_delay=60)
+def fail(value):
+    raise ValueError(value)
+
+
+@task(batch=True)
+def remember_batch_or_fail(payloads):
+    for value, in payloads:
+        if value == 'boom':
+            raise ValueError(value)
+    calls.append([value for value, in payloads])
+
+
+class QueueTests(TestCase):
+
+    def setUp(self):
+        calls.clear()
+
+    def test_jobs_run_in_order(self):
+        """Задачи выполняются по порядку постановки и удаляются."""
+        remember.enqueue(1)
+        remember.enqueue(2)
+        self.assertEqual(Worker().run_pending(), 2)
+        self.assertEqual(calls, [1, 2])
+        self.assertFalse(Job.objects.exists())
+
+    def test_key_deduplicates_queued_jobs(self):
+        """Ожидающая задача с тем же ключом не дублируется."""
+        remember.enqueue(1, key='same')
+        remember.enqueue(2, key='same')
+        remember.enqueue(3)
+        Worker().run_pending()
+        self.assertEqual(calls, [1, 3])
+
+    def test_batch_task_gets_jobs_of_same_type(self):
+        """Пакетная задача получает готовые задачи своего типа пачкой."""
+        for value in range(5):
+            remember_batch.enqueue(value)
+        remember.enqueue('one')
+        self.assertEqual(Worker(batch_size=3).run_once(), 3)
+        Worker(batch_size=3).run_pending()
+        self.assertEqual(calls, [[0, 1, 2], [3, 4], 'one'])
+
+    def test_failed_job_is_retried_with_delay(self):
+        """Упавшая задача повторяется позже, после последней попытки
+        остаётся в состоянии ошибки."""
+        fail.enqueue('boom')
+        with self.assertLogs('jobs.queue', 'ERROR'):
+            Worker().run_pending()
+        job = Job.objects.get()
+        self.assertEqual((job.status, job.attempts), (Job.QUEUED, 1))
+        self.assertGreater(job.run_at,
+                           timezone.now() + timedelta(seconds=50))
+        Job.objects.update(run_at=timezone.now())
+        with self.assertLogs('jobs.queue', 'ERROR'):
+            Worker().run_pending()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 2))
+        self.assertIn('ValueError: boom', job.last_error)
+
+    def test_failed_batch_runs_jobs_one_by_one(self):
+        """Одна упавшая задача не тянет за собой остальные задачи
+        своей пачки: они выполняются по одной."""
+        for value in (1, 'boom', 2):
+            remember_batch_or_fail.enqueue(value)
+        with self.assertLogs('jobs.queue', 'WARNING') as logs:
+            self.assertEqual(Worker().run_once(), 3)
+        self.assertEqual(len(logs.records), 2)
+        self.assertEqual(calls, [[1], [2]])
+        job = Job.objects.get()
+        self.assertEqual((job.payload, job.status), ('["boom"]', Job.QUEUED))
+
+    def test_unknown_and_stale_jobs(self):
+        """Задача без обработчика падает, задача упавшего исполнителя
+        возвращается в очередь."""
+        Job.objects.create(name='jobs.missing.task')
+        with self.assertLogs('jobs.queue', 'ERROR'):
+            Worker().run_pending()
+        self.assertEqual(Job.objects.get().status, Job.FAILED)
+        stale = Job.objects.create(
+            name=remember.name, payload='[1]', status=Job.RUNNING,
+            attempts=1, locked_at=timezone.now() - timedelta(days=1))
+        Worker().requeue_stale()
+        stale.refresh_from_db()
+        self.assertEqual(stale.status, Job.QUEUED)
+
+    @override_settings(JOBS_EAGER=True)
+    def test_eager_mode_runs_immediately(self):
+        remember.enqueue(1)
+        self.assertEqual(calls, [1])
+        self.assertFalse(Job.objects.exists())
+
+
+class RunWorkersTests(TransactionTestCase):
+
+    def setUp(self):
+        calls.clear()
+
+    def test_rolled_back_job_is_not_queued(self):
+        """Задача из откатившейся транзакции не попадает в очередь."""
+        try:
+            with transaction.atomic():
+                remember.enqueue('lost')
+                raise ValueError
+        except ValueError:
+            pass
+        self.assertFalse(Job.objects.exists())
+
+    def test_command_drains_queue(self):
+        """run_workers --burst выполняет все задачи и завершается."""
+        for value in range(20):
+            remember_batch.enqueue(value)
+        # Тестовая база SQLite в памяти с общим кешем не ждёт снятия
+        # блокировок, поэтому здесь один поток.
+        call_command('run_workers', workers=1, batch_size=5, burst=True,
+                     stdout=StringIO())
+        self.assertFalse(Job.objects.exists())
+        self.assertEqual(sorted(value for batch in calls for value in batch),
+                         list(range(20)))
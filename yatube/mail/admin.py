@@ -0,0 +1,34 @@
+from django.contrib import admin
+
+from .models import OutboxMessage
+from .outbox import enqueue
+
+
+class OutboxMessageAdmin(admin.ModelAdmin):
+
+    list_display = ('pk',
+                    'subject',
+                    'recipients',
+                    'attempts',
+                    'failed',
+                    'created',
+                    )
+    list_filter = ('failed',)
+    search_fields = ('subject', 'recipients')
+    exclude = ('data',)
+    readonly_fields = ('attempts', 'failed', 'last_error', 'created')
+    actions = ('resend',)
+
+    def resend(self, request, queryset):
+        messages = list(queryset.filter(failed=True).values_list(
+            'pk', flat=True))
+        OutboxMessage.objects.filter(pk__in=messages).update(
+            failed=False, attempts=0)
+        for message_id in messages:
+            enqueue(message_id)
+        self.message_user(request,
+                          f'Поставлено в очередь: {len(messages)}')
+    resend.short_description = 'Отправить снова'
+
+
+admin.site.register(OutboxMessage, OutboxMessageAdmin)
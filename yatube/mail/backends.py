@@ -0,0 +1,28 @@
+from django.core.mail.backends.base import BaseEmailBackend
+from django.db import DatabaseError, transaction
+
+from .models import OutboxMessage
+from .outbox import enqueue
+
+
+class QueuedEmailBackend(BaseEmailBackend):
+    """Кладёт письма в исходящие, не дожидаясь отправки. Письмо
+    и задача на его отправку сохраняются в одной транзакции."""
+
+    def send_messages(self, email_messages):
+        queued = 0
+        for email_message in email_messages:
+            if not email_message.recipients():
+                continue
+            try:
+                # Письмо без задачи никто бы не отправил.
+                with transaction.atomic():
+                    message = OutboxMessage.from_email_message(email_message)
+                    message.save()
+                    enqueue(message.pk)
+            except DatabaseError:
+                if not self.fail_silently:
+                    raise
+                continue
+            queued += 1
+        return queued
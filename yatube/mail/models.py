@@ -0,0 +1,58 @@
+import copy
+import pickle
+
+from django.db import models
+
+
+class OutboxMessage(models.Model):
+    """Письмо, ждущее отправки. Отправленные письма удаляются, в таблице
+    остаются ожидающие и те, что не удалось отправить за все попытки."""
+
+    subject = models.CharField(
+        max_length=255,
+        blank=True,
+        verbose_name='Тема',
+    )
+    recipients = models.TextField(
+        verbose_name='Получатели',
+    )
+    data = models.BinaryField(
+        verbose_name='Письмо',
+    )
+    attempts = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Попыток',
+    )
+    failed = models.BooleanField(
+        default=False,
+        verbose_name='Не отправлено',
+    )
+    last_error = models.TextField(
+        blank=True,
+        verbose_name='Последняя ошибка',
+    )
+    created = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Создано',
+    )
+
+    class Meta:
+        ordering = ('id',)
+        verbose_name = 'Исходящее письмо'
+        verbose_name_plural = 'Исходящие письма'
+
+    def __str__(self) -> str:
+        return f'{self.subject} → {self.recipients}'
+
+    @classmethod
+    def from_email_message(cls, email_message):
+        # Соединение, через которое письмо собирались отправить,
+        # не сериализуется и при отправке не нужно.
+        email_message = copy.copy(email_message)
+        email_message.connection = None
+        return cls(subject=str(email_message.subject)[:255],
+                   recipients=', '.join(email_message.recipients()),
+                   data=pickle.dumps(email_message))
+
+    def load(self):
+        return pickle.loads(bytes(self.data))
@@ -0,0 +1,60 @@
+"""Исходящая почта.
+
+QueuedEmailBackend сохраняет письмо в таблицу OutboxMessage и ставит
+на него задачу send_messages в очередь jobs в одной транзакции и сразу
+возвращается. Исполнители (manage.py run_workers) берут
+эти задачи пачками и отправляют письма пачки через одно соединение
+транспорта MAIL_TRANSPORT.
+"""
+import logging
+import traceback
+
+from django.conf import settings
+from django.core.mail import get_connection
+
+from jobs.queue import task
+
+from .models import OutboxMessage
+
+logger = logging.getLogger(__name__)
+
+
+def outbox_key(message_id):
+    return f'mail:{message_id}'
+
+
+def enqueue(message_id, delay=0):
+    send_messages.enqueue(message_id, key=outbox_key(message_id),
+                          delay=delay)
+
+
+@task(batch=True)
+def send_messages(payloads):
+    """Отправляет пачку писем через одно соединение. Неотправленное
+    письмо ставится в очередь снова с растущей задержкой, пока
+    не кончатся попытки. Пока идёт отправка, база не пишется."""
+    messages = list(OutboxMessage.objects.filter(
+        pk__in=[message_id for message_id, in payloads], failed=False))
+    if not messages:
+        return
+    sent = []
+    unsent = []
+    with get_connection(settings.MAIL_TRANSPORT) as connection:
+        for message in messages:
+            try:
+                connection.send_messages([message.load()])
+            except Exception:
+                logger.exception('Письмо %s не отправлено', message.pk)
+                unsent.append((message, traceback.format_exc()))
+            else:
+                sent.append(message.pk)
+    OutboxMessage.objects.filter(pk__in=sent).delete()
+    for message, error in unsent:
+        message.attempts += 1
+        message.last_error = error
+        if message.attempts >= send_messages.max_attempts:
+            message.failed = True
+        else:
+            enqueue(message.pk, delay=send_messages.retry_delay
+                    * 2 ** (message.attempts - 1))
+        message.save(update_fields=('attempts', 'failed', 'last_error'))
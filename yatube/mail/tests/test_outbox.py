@@ -0,0 +1,103 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.db import DatabaseError
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from jobs.models import Job
+from jobs.queue import Worker
+from posts.models import User
+
+from ..models import OutboxMessage
+from ..outbox import outbox_key, send_messages
+
+opened = []
+
+
+class RecordingBackend(EmailBackend):
+    """Транспорт в памяти, который считает открытые соединения
+    и не принимает писем на bad@example.com."""
+
+    def open(self):
+        opened.append(self)
+        return True
+
+    def send_messages(self, messages):
+        for message in messages:
+            if 'bad@example.com' in message.recipients():
+                raise ConnectionError('Получатель недоступен')
+        return super().send_messages(messages)
+
+
+@override_settings(EMAIL_BACKEND='mail.backends.QueuedEmailBackend',
+                   MAIL_TRANSPORT='mail.tests.test_outbox.RecordingBackend')
+class OutboxTests(TestCase):
+
+    def setUp(self):
+        opened.clear()
+
+    def send(self, *recipients):
+        for recipient in recipients:
+            mail.send_mail('Тема', 'Текст', 'from@example.com', [recipient])
+
+    def test_password_reset_only_queues_email(self):
+        """Сброс пароля сохраняет письмо в исходящие, отправляет его
+        исполнитель."""
+        User.objects.create_user(username='reader',
+                                 email='reader@example.com',
+                                 password='pass')
+        response = Client().post(reverse('users:password_reset'),
+                                 {'email': 'reader@example.com'})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(mail.outbox, [])
+        message = OutboxMessage.objects.get()
+        self.assertEqual(message.recipients, 'reader@example.com')
+        self.assertTrue(Job.objects.filter(
+            key=outbox_key(message.pk)).exists())
+        Worker().run_pending()
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['reader@example.com'])
+        self.assertFalse(OutboxMessage.objects.exists())
+
+    def test_message_is_not_kept_without_job(self):
+        """Если задачу поставить не удалось, письмо не остаётся
+        в исходящих без отправки."""
+        with mock.patch('mail.backends.enqueue', side_effect=DatabaseError):
+            with self.assertRaises(DatabaseError):
+                self.send('reader@example.com')
+            self.assertEqual(mail.send_mail(
+                'Тема', 'Текст', 'from@example.com', ['reader@example.com'],
+                fail_silently=True), 0)
+        self.assertFalse(OutboxMessage.objects.exists())
+
+    def test_batch_uses_one_connection(self):
+        """Пачка писем уходит через одно соединение транспорта."""
+        self.send(*(f'user{number}@example.com' for number in range(5)))
+        Worker(batch_size=10).run_pending()
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertEqual(len(opened), 1)
+
+    def test_unsent_message_is_retried(self):
+        """Неотправленное письмо ставится в очередь снова с задержкой
+        и после последней попытки остаётся в исходящих."""
+        self.send('good@example.com', 'bad@example.com')
+        with self.assertLogs('mail.outbox', 'ERROR'):
+            Worker().run_pending()
+        self.assertEqual([message.to for message in mail.outbox],
+                         [['good@example.com']])
+        message = OutboxMessage.objects.get()
+        self.assertEqual((message.attempts, message.failed), (1, False))
+        self.assertIn('ConnectionError', message.last_error)
+        job = Job.objects.get(key=outbox_key(message.pk))
+        self.assertGreater(job.run_at, timezone.now())
+        for _ in range(send_messages.max_attempts - 1):
+            Job.objects.update(run_at=timezone.now() - timedelta(seconds=1))
+            with self.assertLogs('mail.outbox', 'ERROR'):
+                Worker().run_pending()
+        message.refresh_from_db()
+        self.assertTrue(message.failed)
+        self.assertFalse(Job.objects.exists())
@@ -1,6 +1,22 @@
 from django.contrib import admin
+from django.core.paginator import Paginator
+from django.db.models import Max
+from django.utils.functional import cached_property
 
-from .models import Group, Post
+from .models import Follow, Group, Post
+from .search import search_post_ids
+
+
+class EstimatedCountPaginator(Paginator):
+    """Без фильтров вместо COUNT(*) по всей таблице берёт MAX(id):
+    SQLite отдаёт его за одно обращение к первичному ключу."""
+
+    @cached_property
+    def count(self):
+        if self.object_list.query.where:
+            return super().count
+        model = self.object_list.model
+        return model._default_manager.aggregate(total=Max('pk'))['total'] or 0
 
 
 class PostAdmin(admin.ModelAdmin):
@@ -12,9 +28,33 @@ class PostAdmin(admin.ModelAdmin):
                     'group',
                     )
     list_editable = ('group',)
+    list_select_related = ('author', 'group')
+    raw_id_fields = ('author',)
     search_fields = ('text',)
     list_filter = ('pub_date',)
+    # Ссылки иерархии строит тег post_date_hierarchy по MIN и MAX даты
+    # (шаблон admin/posts/post/change_list.html).
+    date_hierarchy = 'pub_date'
     empty_value_display = '-пусто-'
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        formfield = super().formfield_for_foreignkey(
+            db_field, request, **kwargs)
+        if db_field.name == 'group':
+            # Список групп загружается один раз на запрос, а не для
+            # каждой строки списка постов.
+            choices = getattr(request, '_group_choices', None)
+            if choices is None:
+                choices = request._group_choices = list(formfield.choices)
+            formfield.choices = choices
+        return formfield
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term.strip():
+            return queryset, False
+        return queryset.filter(pk__in=search_post_ids(search_term)), False
 
 
 class GroupAdmin(admin.ModelAdmin):
@@ -31,5 +71,17 @@ class GroupAdmin(admin.ModelAdmin):
     list_filter = ('title',)
 
 
+class FollowAdmin(admin.ModelAdmin):
+
+    list_display = ('pk',
+                    'user',
+                    'author',
+                    'group',
+                    )
+    list_select_related = ('user', 'author', 'group')
+    raw_id_fields = ('user', 'author', 'group')
+
+
 admin.site.register(Post, PostAdmin)
 admin.site.register(Group, GroupAdmin)
+admin.site.register(Follow, FollowAdmin)
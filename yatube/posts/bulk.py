@@ -0,0 +1,117 @@
+from contextlib import contextmanager
+
+from django.db import transaction
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .lookups import existence
+from .models import AuthorStats, Follow, Group, Post, SiteStats, User
+from .triggers import drop_triggers, install_triggers, rebuild_search_index
+
+
+@contextmanager
+def keep_post_dates():
+    """Отключает auto_now и auto_now_add у дат поста, чтобы bulk_create
+    сохранил даты из импортируемых данных."""
+    fields = [Post._meta.get_field(name) for name in ('pub_date', 'updated')]
+    flags = [(field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, (auto_now, auto_now_add) in zip(fields, flags):
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+class LookupCache:
+    """Кеш соответствия «значение поля -> id» для связанных моделей.
+
+    Неизвестные значения разрешаются пачкой, одним запросом на пачку.
+    """
+
+    def __init__(self, queryset, field):
+        self.queryset = queryset
+        self.field = field
+        self.ids = {}
+
+    def resolve(self, values):
+        missing = {value for value in values if value not in self.ids}
+        missing.discard(None)
+        if missing:
+            found = dict(self.queryset.filter(
+                **{f'{self.field}__in': missing}
+            ).values_list(self.field, 'pk'))
+            for value in missing:
+                self.ids[value] = found.get(value)
+
+    def get(self, value):
+        return self.ids.get(value)
+
+
+def count_rows(model, field, outer_field):
+    return Coalesce(Subquery(
+        model.objects.filter(**{field: OuterRef(outer_field)})
+        .order_by()
+        .values(field)
+        .annotate(total=Count('pk'))
+        .values('total')
+    ), 0)
+
+
+def rebuild_post_counters():
+    """Пересчитывает по таблицам счётчики постов и подписчиков
+    авторов и групп и общее число постов."""
+    with transaction.atomic():
+        SiteStats.objects.update_or_create(
+            pk=1, defaults={'posts_count': Post.objects.count()})
+        AuthorStats.objects.bulk_create(
+            AuthorStats(author_id=author_id)
+            for author_id in User.objects.filter(
+                stats__isnull=True).values_list('pk', flat=True)
+        )
+        Group.objects.update(
+            posts_count=count_rows(Post, 'group', 'pk'),
+            followers_count=count_rows(Follow, 'group', 'pk'),
+        )
+        AuthorStats.objects.update(
+            posts_count=count_rows(Post, 'author', 'author'),
+            followers_count=count_rows(Follow, 'author', 'author'),
+        )
+
+
+@contextmanager
+def bulk_load(connection):
+    """Массовая загрузка постов в SQLite: на время загрузки снимает
+    триггеры и вторичные индексы таблицы постов, после неё строит
+    индексы заново, возвращает триггеры и пересчитывает счётчики
+    и полнотекстовый индекс."""
+    existence.record('post')
+    if connection.vendor != 'sqlite':
+        try:
+            yield
+        finally:
+            existence.record('post')
+        return
+    table = Post._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT name, sql FROM sqlite_master "
+            "WHERE type = 'index' AND tbl_name = %s AND sql IS NOT NULL",
+            [table],
+        )
+        indexes = cursor.fetchall()
+    drop_triggers(connection)
+    with connection.cursor() as cursor:
+        for name, _ in indexes:
+            cursor.execute(f'DROP INDEX {name}')
+    try:
+        yield
+    finally:
+        with connection.cursor() as cursor:
+            for _, sql in indexes:
+                cursor.execute(sql)
+        install_triggers(connection.alias)
+        rebuild_post_counters()
+        rebuild_search_index(connection)
+        existence.record('post')
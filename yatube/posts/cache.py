@@ -0,0 +1,158 @@
+import time
+from functools import wraps
+from hashlib import md5
+
+from django.conf import settings
+from django.core.cache import cache
+
+from core.replicas import reading_replica
+
+FEED_CACHE_TIMEOUT = settings.FEED_CACHE_TIMEOUT
+
+
+def feed_version_key(feed):
+    return f'feed-version:{feed}'
+
+
+def get_feed_version(feed):
+    key = feed_version_key(feed)
+    version = cache.get(key)
+    if version is None:
+        # Начальная версия берётся из времени, чтобы после вытеснения
+        # ключа из кеша старые страницы не стали снова актуальными.
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def feed_changed_key(feed):
+    return f'feed-changed:{feed}'
+
+
+def bump_feed_versions(*feeds):
+    for feed in set(feeds):
+        try:
+            cache.incr(feed_version_key(feed))
+        except ValueError:
+            pass
+    if settings.REPLICA_DATABASES:
+        cache.set_many({feed_changed_key(feed): True for feed in feeds},
+                       settings.REPLICA_LAG)
+
+
+def may_be_stale(*feeds):
+    """Реплика может ещё не видеть изменение ленты, сделанное меньше
+    REPLICA_LAG секунд назад. Такой ответ нельзя кешировать под новой
+    версией ленты: устаревшая страница жила бы до следующего изменения."""
+    return reading_replica() and bool(cache.get_many(
+        [feed_changed_key(feed) for feed in feeds]))
+
+
+def index_feed():
+    return 'index'
+
+
+def group_feed(slug):
+    return f'group:{slug}'
+
+
+def profile_feed(username):
+    return f'profile:{username}'
+
+
+def get_page_cache_key(feed, request):
+    path = md5(request.build_absolute_uri().encode()).hexdigest()
+    return f'feed-page:{feed}:{get_feed_version(feed)}:{path}'
+
+
+def cache_feed_page(get_feed, anonymous_only=True):
+    """Кеширует страницу ленты для анонимных GET-запросов.
+
+    Ключ включает версию ленты, поэтому изменение поста сбрасывает
+    только те ленты, в которых он показан. Ответы, одинаковые для
+    всех пользователей, кешируются с anonymous_only=False.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if (request.method not in ('GET', 'HEAD')
+                    or anonymous_only and request.user.is_authenticated):
+                return view(request, *args, **kwargs)
+            feed = get_feed(*args, **kwargs)
+            key = get_page_cache_key(feed, request)
+            response = cache.get(key)
+            if response is None:
+                response = view(request, *args, **kwargs)
+                if response.status_code == 200 and not may_be_stale(feed):
+                    cache.set(key, response, FEED_CACHE_TIMEOUT)
+            return response
+        return wrapper
+    return decorator
+
+
+def feed_etag(get_feed, per_user=True, get_object=None):
+    """ETag ленты из версии в кеше: проверка не обращается к базе.
+
+    get_object проверяет, что группа или автор ленты существуют,
+    и бросает Http404, иначе на несуществующий адрес пришёл бы 304.
+    """
+    def etag(request, *args, **kwargs):
+        if get_object is not None:
+            get_object(*args, **kwargs)
+        feed = get_feed(*args, **kwargs)
+        if may_be_stale(feed):
+            return None
+        version = get_feed_version(feed)
+        if not per_user:
+            return str(version)
+        return f'{version}-{user_etag(request)}'
+    return etag
+
+
+def user_etag(request):
+    """Часть ETag, зависящая от пользователя. Страницы вошедшего
+    пользователя содержат формы с CSRF-токеном, который меняется при
+    входе, поэтому в ETag входит хеш CSRF-cookie и ключа сессии:
+    после нового входа браузер не получит 304 на страницу со старым
+    токеном."""
+    if not request.user.is_authenticated:
+        return '0'
+    secret = '{}:{}'.format(
+        request.COOKIES.get(settings.CSRF_COOKIE_NAME, ''),
+        request.session.session_key,
+    )
+    return f'{request.user.pk}-{md5(secret.encode()).hexdigest()[:16]}'
+
+
+def post_validator_key(post_id):
+    return f'post-validator:{post_id}'
+
+
+def remember_post_validator(post):
+    """Сохраняет данные для ETag поста. Возвращает False, если пост
+    прочитан с реплики, которая может не видеть последней правки."""
+    feeds = [profile_feed(post.author.username)]
+    if post.group is not None:
+        feeds.append(group_feed(post.group.slug))
+    if may_be_stale(*feeds):
+        return False
+    cache.set(post_validator_key(post.pk),
+              (post.updated.timestamp(), feeds),
+              FEED_CACHE_TIMEOUT)
+    return True
+
+
+def forget_post_validator(post_id):
+    cache.delete(post_validator_key(post_id))
+
+
+def post_etag(request, post_id):
+    """ETag страницы поста. Собирается из данных, сохранённых при
+    последней отрисовке, и версий лент автора и группы, которые
+    меняются вместе с именем автора, числом его постов и группой."""
+    validator = cache.get(post_validator_key(post_id))
+    if validator is None:
+        return None
+    updated, feeds = validator
+    versions = '-'.join(str(get_feed_version(feed)) for feed in feeds)
+    return f'{updated}-{versions}-{user_etag(request)}'
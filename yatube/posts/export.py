@@ -0,0 +1,79 @@
+import csv
+import json
+from datetime import datetime, time, timedelta
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import Post
+
+EXPORT_FIELDS = {
+    'id': 'pk',
+    'text': 'text',
+    'pub_date': 'pub_date',
+    'author': 'author__username',
+    'group': 'group__slug',
+}
+CHUNK_SIZE = 2000
+
+
+def parse_bound(value, end=False):
+    """Разбирает границу периода: дату или дату со временем.
+    Для конца периода дата без времени включает весь день."""
+    if not value:
+        return None
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f'Неверная дата: {value}')
+        moment = datetime.combine(day + timedelta(days=end), time.min)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def filter_posts(author=None, group=None, since=None, until=None):
+    posts = Post.objects.order_by('pk')
+    if author:
+        posts = posts.filter(author__username=author)
+    if group:
+        posts = posts.filter(group__slug=group)
+    since = parse_bound(since)
+    if since is not None:
+        posts = posts.filter(pub_date__gte=since)
+    until = parse_bound(until, end=True)
+    if until is not None:
+        posts = posts.filter(pub_date__lt=until)
+    return posts
+
+
+def export_rows(posts, chunk_size=CHUNK_SIZE):
+    rows = posts.values_list(*EXPORT_FIELDS.values())
+    for row in rows.iterator(chunk_size=chunk_size):
+        row = dict(zip(EXPORT_FIELDS, row))
+        row['pub_date'] = row['pub_date'].isoformat()
+        yield row
+
+
+def write_jsonl(rows):
+    for row in rows:
+        yield json.dumps(row, ensure_ascii=False) + '\n'
+
+
+class LineBuffer:
+    def write(self, value):
+        return value
+
+
+def write_csv(rows):
+    writer = csv.DictWriter(LineBuffer(), fieldnames=list(EXPORT_FIELDS))
+    yield writer.writerow(dict(zip(EXPORT_FIELDS, EXPORT_FIELDS)))
+    for row in rows:
+        yield writer.writerow(row)
+
+
+WRITERS = {
+    'jsonl': (write_jsonl, 'application/x-ndjson'),
+    'csv': (write_csv, 'text/csv'),
+}
@@ -0,0 +1,82 @@
+from django.contrib.syndication.views import Feed
+from django.urls import reverse, reverse_lazy
+from django.utils.feedgenerator import Atom1Feed
+from django.views.decorators.http import condition
+
+from .cache import (
+    cache_feed_page, feed_etag, group_feed, index_feed, profile_feed
+)
+from .lookups import author_lookup, get_author, get_group, group_lookup
+from .utils import (
+    QUANTITY_OF_POSTS, get_author_posts, get_group_posts, get_index_posts
+)
+
+
+class LatestPostsFeed(Feed):
+    feed_type = Atom1Feed
+    title = 'Yatube: последние обновления на сайте'
+    link = reverse_lazy('posts:main_page')
+
+    def items(self):
+        return get_index_posts()[:QUANTITY_OF_POSTS]
+
+    def item_title(self, item):
+        return item.excerpt
+
+    def item_description(self, item):
+        return item.text_html
+
+    def item_link(self, item):
+        return reverse('posts:post_detail', args=(item.pk,))
+
+    def item_author_name(self, item):
+        return item.author.get_full_name() or item.author.username
+
+    def item_pubdate(self, item):
+        return item.pub_date
+
+    def item_updateddate(self, item):
+        return item.updated
+
+
+class GroupPostsFeed(LatestPostsFeed):
+
+    def get_object(self, request, slug):
+        return group_lookup.get(slug)
+
+    def title(self, group):
+        return f'Yatube: {group.title}'
+
+    def link(self, group):
+        return reverse('posts:group_list', args=(group.slug,))
+
+    def items(self, group):
+        return get_group_posts(group)[:QUANTITY_OF_POSTS]
+
+
+class AuthorPostsFeed(LatestPostsFeed):
+
+    def get_object(self, request, username):
+        return author_lookup.get(username)
+
+    def title(self, author):
+        return f'Yatube: записи {author.get_full_name() or author}'
+
+    def link(self, author):
+        return reverse('posts:profile', args=(author.username,))
+
+    def items(self, author):
+        return get_author_posts(author)[:QUANTITY_OF_POSTS]
+
+
+def cached_feed(feed, get_feed, get_object=None):
+    """Сериализованная лента одинакова для всех читателей, поэтому
+    кешируется целиком и отвечает 304 по версии ленты."""
+    view = cache_feed_page(get_feed, anonymous_only=False)(feed)
+    return condition(etag_func=feed_etag(
+        get_feed, per_user=False, get_object=get_object))(view)
+
+
+latest_posts_feed = cached_feed(LatestPostsFeed(), index_feed)
+group_posts_feed = cached_feed(GroupPostsFeed(), group_feed, get_group)
+author_posts_feed = cached_feed(AuthorPostsFeed(), profile_feed, get_author)
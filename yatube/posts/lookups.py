@@ -0,0 +1,315 @@
+"""Процессные кеши поиска групп, авторов и постов.
+
+LookupCache держит найденные группы и авторов. Запись действительна,
+пока не истёк TTL и не изменилась версия ленты объекта в общем кеше:
+версия растёт при сохранении и удалении группы или автора и при
+изменении их постов, поэтому другие процессы узнают об изменениях
+без отдельной рассылки.
+
+ExistenceIndex отвечает на обратный вопрос: каких объектов точно нет.
+Он держит фильтры Блума по slug групп и username авторов и наибольший
+id поста. Строит его фоновый поток, запущенный при старте сервера,
+поэтому запросы его не ждут. Значения разложены по корзинам, у каждой
+корзины в общем кеше есть метка, которую меняет любая запись в неё.
+Ответ «нет» даётся, только если метка корзины не менялась с построения
+индекса; пропавшая или изменённая метка значит «может быть», поэтому
+другие процессы не теряют созданные объекты. Не найденные в базе
+значения ненадолго запоминаются там же с текущей меткой корзины.
+"""
+import logging
+import math
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from hashlib import blake2b
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Max
+from django.http import Http404
+
+from .cache import get_feed_version, group_feed, profile_feed
+from .models import Group, Post, User
+
+logger = logging.getLogger(__name__)
+
+EXISTENCE_BUCKETS = 64
+NEGATIVE_CACHE_TIMEOUT = settings.NEGATIVE_CACHE_TIMEOUT
+
+
+def get_bucket(kind, value):
+    if kind == 'post':
+        return 0
+    digest = blake2b(str(value).encode(), digest_size=8).digest()
+    return int.from_bytes(digest, 'little') % EXISTENCE_BUCKETS
+
+
+def bucket_key(kind, bucket):
+    return f'existence:{kind}:{bucket}'
+
+
+def missing_key(kind, value):
+    return f'missing:{kind}:{value}'
+
+
+def new_token():
+    return uuid.uuid4().hex
+
+
+class BloomFilter:
+    """Фильтр Блума: «нет» точно, «есть» с вероятностью ошибки
+    error_rate при заполнении до capacity значений."""
+
+    def __init__(self, capacity, error_rate):
+        capacity = max(capacity, 1)
+        self.size = max(64, int(
+            -capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def positions(self, value):
+        digest = blake2b(str(value).encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        step = int.from_bytes(digest[8:], 'little') | 1
+        return ((first + number * step) % self.size
+                for number in range(self.hashes))
+
+    def add(self, value):
+        for position in self.positions(value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, value):
+        return all(self.bits[position >> 3] & (1 << (position & 7))
+                   for position in self.positions(value))
+
+
+class ExistenceIndex:
+    """Какие группы, авторы и посты точно не существуют.
+
+    Строится из базы в фоновом потоке (start). Вид объектов строится
+    заново, когда после записей изменилось больше четверти его корзин
+    (для постов достаточно одной, их пересчёт дёшев), и весь индекс —
+    раз в ttl секунд. Пока индекс не построен, он отвечает «может
+    быть», и запрос идёт в базу.
+    """
+
+    SOURCES = {
+        'group': (Group, 'slug'),
+        'author': (User, 'username'),
+        'post': (Post, 'pk'),
+    }
+
+    def __init__(self, error_rate, ttl):
+        self.error_rate = error_rate
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.filters = {}
+        self.max_post_id = 0
+        self.tokens = {}
+        self.changed = {}
+        self.outdated = threading.Event()
+        self.thread = None
+
+    def read_tokens(self, kind):
+        buckets = range(1 if kind == 'post' else EXISTENCE_BUCKETS)
+        keys = [bucket_key(kind, bucket) for bucket in buckets]
+        tokens = cache.get_many(keys)
+        missing = [key for key in keys if key not in tokens]
+        if missing:
+            for key in missing:
+                cache.add(key, new_token(), None)
+            tokens.update(cache.get_many(missing))
+        return [tokens.get(key) for key in keys]
+
+    def rebuild(self, kinds=None):
+        """Строит индекс из базы. Метки корзин читаются до запросов,
+        поэтому записи во время построения сменят их и не потеряются."""
+        for kind in self.SOURCES if kinds is None else kinds:
+            tokens = self.read_tokens(kind)
+            model, field = self.SOURCES[kind]
+            if kind == 'post':
+                data = model.objects.aggregate(
+                    max_id=Max(field))['max_id'] or 0
+            else:
+                values = list(model._default_manager.values_list(
+                    field, flat=True))
+                data = BloomFilter(max(len(values) * 2, 1024),
+                                   self.error_rate)
+                for value in values:
+                    data.add(value)
+            with self.lock:
+                if kind == 'post':
+                    self.max_post_id = data
+                else:
+                    self.filters[kind] = data
+                self.tokens[kind] = tokens
+                self.changed[kind] = set()
+
+    def start(self):
+        """Запускает фоновый поток, который строит индекс и перестраивает
+        его раз в ttl секунд или раньше, когда изменилось много корзин."""
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.run, daemon=True,
+                                           name='existence-index')
+            self.thread.start()
+
+    def run(self):
+        kinds = None
+        while True:
+            self.outdated.clear()
+            try:
+                self.rebuild(kinds)
+            except Exception:
+                logger.exception('Не удалось построить индекс объектов')
+            finally:
+                connection.close()
+            if self.outdated.wait(self.ttl):
+                kinds = self.outdated_kinds()
+            else:
+                kinds = None
+
+    def outdated_kinds(self):
+        with self.lock:
+            return [kind for kind in self.SOURCES
+                    if kind not in self.tokens
+                    or len(self.changed[kind]) > self.changed_limit(kind)]
+
+    def changed_limit(self, kind):
+        return 0 if kind == 'post' else EXISTENCE_BUCKETS // 4
+
+    def might_exist(self, kind, value, token):
+        """False, только если значения нет в индексе, а метка его
+        корзины token в общем кеше с построения не менялась."""
+        bucket = get_bucket(kind, value)
+        with self.lock:
+            if kind not in self.tokens:
+                return True
+            if kind == 'post':
+                if value <= self.max_post_id:
+                    return True
+            elif value in self.filters[kind]:
+                return True
+            if token is not None and self.tokens[kind][bucket] == token:
+                return False
+            self.changed[kind].add(bucket)
+            if len(self.changed[kind]) > self.changed_limit(kind):
+                self.outdated.set()
+            return True
+
+    def record(self, kind, *values):
+        """Сообщает всем процессам, что значения могли появиться: меняет
+        метки их корзин сейчас и после фиксации транзакции. Вызывается
+        до записи в базу и ещё раз после неё."""
+        keys = {bucket_key(kind, get_bucket(kind, value))
+                for value in values or (None,)}
+
+        def touch():
+            cache.set_many({key: new_token() for key in keys}, None)
+
+        touch()
+        transaction.on_commit(touch)
+
+    def invalidate(self):
+        """Процесс перестанет верить индексу до его перестроения."""
+        with self.lock:
+            self.tokens.clear()
+        self.outdated.set()
+
+
+existence = ExistenceIndex(settings.EXISTENCE_FILTER_ERROR_RATE,
+                           settings.EXISTENCE_FILTER_TTL)
+
+
+def get_existing(kind, value, queryset, **lookup):
+    """Объект из queryset или Http404. Значения, которых точно нет
+    по фильтру или по недавнему промаху, не доходят до базы."""
+    token_key = bucket_key(kind, get_bucket(kind, value))
+    entries = cache.get_many([token_key, missing_key(kind, value)])
+    token = entries.get(token_key)
+    if token is not None and (
+            not existence.might_exist(kind, value, token)
+            or entries.get(missing_key(kind, value)) == token):
+        raise Http404
+    instance = queryset.filter(**lookup).first()
+    if instance is None:
+        if token is not None:
+            cache.set(missing_key(kind, value), token,
+                      NEGATIVE_CACHE_TIMEOUT)
+        raise Http404
+    return instance
+
+
+class LookupCache:
+    """LRU-кеш объектов модели по уникальному полю с TTL.
+
+    Хранит значения полей, а не сам объект: каждый запрос получает
+    свой экземпляр и не видит кеши связей, заполненные другими.
+    """
+
+    def __init__(self, kind, model, field, get_feed, maxsize, ttl):
+        self.kind = kind
+        self.model = model
+        self.field = field
+        self.get_feed = get_feed
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, value):
+        """Объект по значению поля или Http404."""
+        version = get_feed_version(self.get_feed(value))
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(value)
+            if entry is not None and entry[0] == version and entry[1] > now:
+                self.entries.move_to_end(value)
+                self.hits += 1
+                return self.model.from_db(*entry[2])
+            self.misses += 1
+        instance = get_existing(self.kind, value,
+                                self.model._default_manager,
+                                **{self.field: value})
+        names = [field.attname for field in self.model._meta.concrete_fields]
+        state = (instance._state.db, names,
+                 [getattr(instance, name) for name in names])
+        with self.lock:
+            self.entries[value] = (version, now + self.ttl, state)
+            self.entries.move_to_end(value)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+        return instance
+
+    def evict(self, *values):
+        with self.lock:
+            for value in values:
+                self.entries.pop(value, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.hits = self.misses = 0
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses,
+                'size': len(self.entries)}
+
+
+group_lookup = LookupCache('group', Group, 'slug', group_feed,
+                           settings.LOOKUP_CACHE_SIZE,
+                           settings.LOOKUP_CACHE_TTL)
+author_lookup = LookupCache('author', User, 'username', profile_feed,
+                            settings.LOOKUP_CACHE_SIZE,
+                            settings.LOOKUP_CACHE_TTL)
+
+
+def get_group(slug):
+    return group_lookup.get(slug)
+
+
+def get_author(username):
+    return author_lookup.get(username)
@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts.models import Post
+from posts.search import SearchResults
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает время поиска по индексу FTS5 и поиска '
+            'LIKE по тексту постов')
+
+    def add_arguments(self, parser):
+        parser.add_argument('terms', nargs='+')
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--limit', type=int, default=10)
+
+    def measure(self, search, repeat):
+        started = time.perf_counter()
+        for _ in range(repeat):
+            search()
+        return (time.perf_counter() - started) / repeat * 1000
+
+    def handle(self, *args, **options):
+        limit = options['limit']
+        self.stdout.write(f'Постов в базе: {Post.objects.count()}')
+        for term in options['terms']:
+            results = SearchResults(term)
+            fts = self.measure(
+                lambda: (results.count(), results[:limit]),
+                options['repeat'],
+            )
+            posts = Post.objects.filter(text__icontains=term)
+            like = self.measure(
+                lambda: (posts.count(), list(posts[:limit])),
+                options['repeat'],
+            )
+            self.stdout.write(
+                f'{term}: FTS5 {fts:.1f} мс, LIKE {like:.1f} мс, '
+                f'ускорение x{like / fts:.1f}'
+            )
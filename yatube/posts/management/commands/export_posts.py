@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.export import CHUNK_SIZE, WRITERS, export_rows, filter_posts
+
+
+class Command(BaseCommand):
+    help = 'Потоково выгружает посты в JSONL или CSV'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=WRITERS, default='jsonl')
+        parser.add_argument('--output', default='-',
+                            help='файл или «-» для stdout')
+        parser.add_argument('--author', help='username автора')
+        parser.add_argument('--group', help='slug группы')
+        parser.add_argument('--since', help='дата начала, YYYY-MM-DD')
+        parser.add_argument('--until', help='дата конца, YYYY-MM-DD')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        try:
+            posts = filter_posts(
+                author=options['author'],
+                group=options['group'],
+                since=options['since'],
+                until=options['until'],
+            )
+        except ValueError as error:
+            raise CommandError(error)
+        writer, _ = WRITERS[options['format']]
+        lines = writer(export_rows(posts, options['chunk_size']))
+        if options['output'] == '-':
+            for line in lines:
+                self.stdout.write(line, ending='')
+            return
+        with open(options['output'], 'w', encoding='utf-8',
+                  newline='') as stream:
+            stream.writelines(lines)
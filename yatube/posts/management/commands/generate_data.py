@@ -0,0 +1,140 @@
+import random
+import time
+from datetime import timedelta
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+from faker import Faker
+
+from posts.bulk import bulk_load
+from posts.cache import bump_feed_versions, group_feed, index_feed
+from posts.lookups import existence
+from posts.models import Group, Post, User
+from posts.text import make_excerpt, render_text_html
+
+TEXT_POOL_SIZE = 1000
+NO_GROUP_SHARE = 0.3
+INSERT_COLUMNS = ('text', 'excerpt', 'text_html', 'pub_date', 'updated',
+                  'author_id', 'group_id')
+
+
+class Command(BaseCommand):
+    help = ('Быстро заполняет базу пользователями, группами и постами '
+            'для нагрузочных проверок')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--groups', type=int, default=10)
+        parser.add_argument('--posts', type=int, default=100000)
+        parser.add_argument('--days', type=int, default=365,
+                            help='За сколько последних дней раскидать посты')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=10000)
+        parser.add_argument('--transaction-size', type=int, default=200000)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        faker = Faker('ru_RU')
+        faker.seed_instance(options['seed'])
+        started = time.perf_counter()
+        author_ids = self.create_users(options['users'])
+        group_ids = self.create_groups(options['groups'], faker)
+        if not author_ids:
+            raise CommandError('Нет пользователей, которым отдать посты')
+        texts = [self.render(faker.paragraph(nb_sentences=rng.randint(1, 4)))
+                 for _ in range(TEXT_POOL_SIZE)]
+        inserted = time.perf_counter()
+        with bulk_load(connection):
+            self.insert_posts(rng, options, author_ids, group_ids, texts)
+            inserted = time.perf_counter() - inserted
+        bump_feed_versions(index_feed(), *(
+            group_feed(slug) for slug in Group.objects.filter(
+                pk__in=group_ids).values_list('slug', flat=True)))
+        total = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Пользователей: {len(author_ids)}, групп: {len(group_ids)}, '
+            f'постов: {options["posts"]}. Вставка постов '
+            f'{options["posts"] / inserted:.0f} строк/с, '
+            f'всего {total:.1f} с'
+        ))
+
+    def create_users(self, count):
+        """Пользователи с непригодным паролем: хеширование настоящих
+        паролей заняло бы больше времени, чем вся остальная загрузка."""
+        last_pk = User.objects.order_by('-pk').values_list(
+            'pk', flat=True).first() or 0
+        password = make_password(None)
+        usernames = [f'gen_user_{last_pk + number}'
+                     for number in range(1, count + 1)]
+        existence.record('author', *usernames)
+        User.objects.bulk_create(
+            User(username=username, password=password)
+            for username in usernames
+        )
+        existence.record('author', *usernames)
+        return list(User.objects.filter(pk__gt=last_pk).values_list(
+            'pk', flat=True)) or list(User.objects.values_list(
+                'pk', flat=True))
+
+    def create_groups(self, count, faker):
+        last_pk = Group.objects.order_by('-pk').values_list(
+            'pk', flat=True).first() or 0
+        slugs = [f'gen-group-{last_pk + number}'
+                 for number in range(1, count + 1)]
+        existence.record('group', *slugs)
+        Group.objects.bulk_create(
+            Group(title=faker.catch_phrase()[:200], slug=slug,
+                  description=faker.paragraph())
+            for slug in slugs
+        )
+        existence.record('group', *slugs)
+        return list(Group.objects.filter(pk__gt=last_pk).values_list(
+            'pk', flat=True)) or list(Group.objects.values_list(
+                'pk', flat=True))
+
+    def render(self, text):
+        return text, make_excerpt(text), render_text_html(text)
+
+    def insert_posts(self, rng, options, author_ids, group_ids, texts):
+        """Вставляет посты пачками через executemany. Даты растут
+        от пачки к пачке, чтобы индексы по pub_date заполнялись
+        по порядку; авторы выбираются по закону Парето, часть постов
+        остаётся без группы."""
+        count = options['posts']
+        batch_size = options['batch_size']
+        author_weights = list(accumulate(
+            rng.paretovariate(2) for _ in author_ids))
+        group_choices = group_ids + [None] * max(
+            1, round(len(group_ids) * NO_GROUP_SHARE / (1 - NO_GROUP_SHARE)))
+        period = options['days'] * 24 * 60 * 60
+        since = timezone.now() - timedelta(seconds=period)
+        # Даты в SQLite хранятся строкой в UTC, без перевода каждой
+        # даты через adapt_datetimefield_value.
+        since = timezone.make_naive(since, timezone.utc)
+        sql = (f'INSERT INTO {Post._meta.db_table} '
+               f'({", ".join(INSERT_COLUMNS)}) '
+               f'VALUES ({", ".join(["%s"] * len(INSERT_COLUMNS))})')
+        for chunk in range(0, count, options['transaction_size']):
+            chunk_end = min(chunk + options['transaction_size'], count)
+            with transaction.atomic(), connection.cursor() as cursor:
+                for offset in range(chunk, chunk_end, batch_size):
+                    size = min(batch_size, chunk_end - offset)
+                    start = period * offset / count
+                    end = period * (offset + size) / count
+                    seconds = sorted(rng.uniform(start, end)
+                                     for _ in range(size))
+                    authors = rng.choices(author_ids,
+                                          cum_weights=author_weights, k=size)
+                    groups = rng.choices(group_choices, k=size)
+                    rows = []
+                    for (text, excerpt, html), second, author, group in zip(
+                            rng.choices(texts, k=size), seconds, authors,
+                            groups):
+                        pub_date = str(since + timedelta(seconds=second))
+                        rows.append((text, excerpt, html, pub_date, pub_date,
+                                     author, group))
+                    cursor.executemany(sql, rows)
+            self.stdout.write(f'Вставлено постов: {chunk_end}')
@@ -0,0 +1,126 @@
+import csv
+import json
+import sys
+import time
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from posts.bulk import LookupCache, keep_post_dates
+from posts.cache import (
+    bump_feed_versions, group_feed, index_feed, profile_feed
+)
+from posts.models import Group, Post, User
+
+
+def read_jsonl(stream):
+    """Строки файла как словари, битая строка — как None."""
+    for line in stream:
+        if line.strip():
+            try:
+                row = json.loads(line)
+            except ValueError:
+                row = None
+            yield row if isinstance(row, dict) else None
+
+
+def read_csv(stream):
+    yield from csv.DictReader(stream)
+
+
+READERS = {
+    'jsonl': read_jsonl,
+    'csv': read_csv,
+}
+
+
+class Command(BaseCommand):
+    help = ('Потоково импортирует посты из JSONL или CSV. '
+            'Поля: text, author (username), group (slug), pub_date.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='файл или «-» для stdin')
+        parser.add_argument('--format', choices=READERS)
+        parser.add_argument('--batch-size', type=int,
+                            help='строк в одном INSERT, по умолчанию '
+                                 'максимум для базы')
+        parser.add_argument('--chunk-size', type=int, default=10000,
+                            help='строк в одной транзакции')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or path.rsplit('.', 1)[-1]
+        if file_format not in READERS:
+            raise CommandError('Укажите формат: --format jsonl или csv')
+        self.batch_size = options['batch_size']
+        self.authors = LookupCache(User.objects.all(), 'username')
+        self.groups = LookupCache(Group.objects.all(), 'slug')
+        self.feeds = {index_feed()}
+        self.imported = self.skipped = 0
+        started = time.perf_counter()
+        if path == '-':
+            self.import_rows(READERS[file_format](sys.stdin),
+                             options['chunk_size'], started)
+        else:
+            with open(path, encoding='utf-8', newline='') as stream:
+                self.import_rows(READERS[file_format](stream),
+                                 options['chunk_size'], started)
+        bump_feed_versions(*self.feeds)
+        self.report(started, final=True)
+
+    def import_rows(self, rows, chunk_size, started):
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                return
+            self.import_chunk(chunk)
+            self.report(started)
+
+    def import_chunk(self, rows):
+        valid = [row for row in rows if row is not None]
+        self.skipped += len(rows) - len(valid)
+        rows = valid
+        self.authors.resolve(row.get('author') for row in rows)
+        self.groups.resolve(row.get('group') or None for row in rows)
+        now = timezone.now()
+        posts = []
+        for row in rows:
+            author_id = self.authors.get(row.get('author'))
+            group_slug = row.get('group') or None
+            group_id = self.groups.get(group_slug)
+            if (not row.get('text') or author_id is None
+                    or (group_slug and group_id is None)):
+                self.skipped += 1
+                continue
+            try:
+                pub_date = parse_datetime(row.get('pub_date') or '') or now
+            except (TypeError, ValueError):
+                # Дата не строкой или несуществующая, например 2020-13-01.
+                self.skipped += 1
+                continue
+            if timezone.is_naive(pub_date):
+                pub_date = timezone.make_aware(pub_date)
+            post = Post(text=row['text'], author_id=author_id,
+                        group_id=group_id, pub_date=pub_date,
+                        updated=pub_date)
+            post.render_text()
+            posts.append(post)
+            self.feeds.add(profile_feed(row['author']))
+            if group_slug:
+                self.feeds.add(group_feed(group_slug))
+        with transaction.atomic(), keep_post_dates():
+            Post.objects.bulk_create(posts, batch_size=self.batch_size)
+        self.imported += len(posts)
+
+    def report(self, started, final=False):
+        elapsed = time.perf_counter() - started
+        rate = self.imported / elapsed if elapsed else 0
+        message = (f'Импортировано {self.imported}, пропущено '
+                   f'{self.skipped}, {rate:.0f} строк/с')
+        if final:
+            self.stdout.write(self.style.SUCCESS(message))
+        else:
+            self.stderr.write(message)
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from posts.bulk import rebuild_post_counters
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счётчики постов и подписчиков у авторов и групп'
+
+    def handle(self, *args, **options):
+        rebuild_post_counters()
+        self.stdout.write(self.style.SUCCESS(
+            'Счётчики постов и подписчиков пересчитаны'))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from posts.triggers import install_triggers, rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает полнотекстовый индекс постов'
+
+    def handle(self, *args, **options):
+        install_triggers()
+        rebuild_search_index(connection)
+        self.stdout.write(self.style.SUCCESS('Поисковый индекс перестроен'))
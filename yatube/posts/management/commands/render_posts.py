@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from posts.models import Post
+from posts.text import render_posts
+
+
+class Command(BaseCommand):
+    help = 'Заполняет анонс и HTML-текст постов'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        rendered = render_posts(Post.objects.all(), options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано постов: {rendered}'))
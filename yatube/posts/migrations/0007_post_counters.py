@@ -0,0 +1,64 @@
+# Generated by Django 2.2.16 on 2026-10-18 05:07
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+import django.db.models.deletion
+
+
+def fill_post_counters(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    Group = apps.get_model('posts', 'Group')
+    AuthorStats = apps.get_model('posts', 'AuthorStats')
+    counts = Post.objects.order_by().values('author').annotate(
+        total=Count('pk'))
+    AuthorStats.objects.bulk_create(
+        AuthorStats(author_id=row['author'], posts_count=row['total'])
+        for row in counts
+    )
+    counts = Post.objects.filter(group__isnull=False).order_by().values(
+        'group').annotate(total=Count('pk'))
+    for row in counts:
+        Group.objects.filter(pk=row['group']).update(
+            posts_count=row['total'])
+
+
+def drop_counter_triggers(apps, schema_editor):
+    # Триггеры ставит posts.triggers.install_triggers после migrate,
+    # при откате они не должны пережить таблицу статистики.
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for name in ('posts_post_count_insert', 'posts_post_count_delete',
+                 'posts_post_count_update'):
+        schema_editor.execute(f'DROP TRIGGER IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0006_post_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='group',
+            name='posts_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество постов'),
+        ),
+        migrations.CreateModel(
+            name='AuthorStats',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('posts_count', models.PositiveIntegerField(default=0, verbose_name='Количество постов')),
+                ('author', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='stats', to=settings.AUTH_USER_MODEL, verbose_name='Автор')),
+            ],
+            options={
+                'verbose_name': 'Статистика автора',
+                'verbose_name_plural': 'Статистика авторов',
+            },
+        ),
+        migrations.RunPython(fill_post_counters, migrations.RunPython.noop),
+        migrations.RunPython(migrations.RunPython.noop,
+                             drop_counter_triggers),
+    ]
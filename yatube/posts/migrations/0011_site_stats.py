@@ -0,0 +1,45 @@
+# Generated by Django 2.2.16 on 2026-10-18 06:29
+
+from django.db import migrations, models
+
+
+# Старые триггеры счётчиков не обновляют число постов сайта:
+# install_triggers после migrate поставит новые, а при откате они
+# не должны пережить таблицу статистики сайта.
+def drop_counter_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for name in ('posts_post_count_insert', 'posts_post_count_delete'):
+        schema_editor.execute(f'DROP TRIGGER IF EXISTS {name}')
+
+
+def fill_site_stats(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    SiteStats = apps.get_model('posts', 'SiteStats')
+    SiteStats.objects.create(pk=1, posts_count=Post.objects.count())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0010_follow_timeline'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_counter_triggers,
+                             migrations.RunPython.noop),
+        migrations.CreateModel(
+            name='SiteStats',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('posts_count', models.PositiveIntegerField(default=0, verbose_name='Количество постов')),
+            ],
+            options={
+                'verbose_name': 'Статистика сайта',
+                'verbose_name_plural': 'Статистика сайта',
+            },
+        ),
+        migrations.RunPython(fill_site_stats, migrations.RunPython.noop),
+        migrations.RunPython(migrations.RunPython.noop,
+                             drop_counter_triggers),
+    ]
@@ -1,10 +1,24 @@
 from django.contrib.auth import get_user_model
-from django.db import models
+from django.db import models, transaction
 from django.urls import reverse
 
+from .text import make_excerpt, render_text_html
+
 User = get_user_model()
 
 
+class PostQuerySet(models.QuerySet):
+
+    def bulk_create(self, *args, **kwargs):
+        # pre_save и post_save здесь не отправляются, поэтому о новых
+        # постах процессам сообщается отдельно до и после вставки.
+        from .lookups import existence
+        existence.record('post')
+        posts = super().bulk_create(*args, **kwargs)
+        existence.record('post')
+        return posts
+
+
 class Post(models.Model):
     text = models.TextField(
         'Текст поста',
@@ -14,6 +28,20 @@ class Post(models.Model):
         auto_now_add=True,
         verbose_name='Дата публикации',
     )
+    updated = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Дата изменения',
+    )
+    excerpt = models.TextField(
+        blank=True,
+        editable=False,
+        verbose_name='Анонс',
+    )
+    text_html = models.TextField(
+        blank=True,
+        editable=False,
+        verbose_name='Текст в HTML',
+    )
     group = models.ForeignKey(
         'Group',
         on_delete=models.SET_NULL,
@@ -30,17 +58,63 @@ class Post(models.Model):
         verbose_name='Автор',
     )
 
+    objects = PostQuerySet.as_manager()
+
     class Meta:
-        ordering = ('-pub_date',)
+        ordering = ('-pub_date', '-id')
+        indexes = (
+            models.Index(
+                fields=('-pub_date', '-id'),
+                name='post_pub_date_id_idx',
+            ),
+            models.Index(
+                fields=('author', '-pub_date', '-id'),
+                name='post_author_pub_date_idx',
+            ),
+            models.Index(
+                fields=('group', '-pub_date', '-id'),
+                name='post_group_pub_date_idx',
+            ),
+        )
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
 
     def __str__(self):
         return self.text[:15]
 
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'text' in update_fields:
+            self.render_text()
+            if update_fields is not None:
+                kwargs['update_fields'] = {
+                    *update_fields, 'excerpt', 'text_html'}
+        # Задача раскладки по лентам ставится из post_save в той же
+        # транзакции, что и сам пост.
+        with transaction.atomic(savepoint=False):
+            super().save(*args, **kwargs)
+
+    def render_text(self):
+        self.excerpt = make_excerpt(self.text)
+        self.text_html = render_text_html(self.text)
+
     def get_absolute_url(self):
         return reverse('post', kwargs={'post_detail': self.pk})
 
+    @property
+    def card_version(self):
+        """Версия карточки поста для кеша фрагментов: меняется при
+        правке поста, смене имени автора или группы."""
+        author = self.author
+        group = self.group
+        return (
+            self.updated,
+            author.username,
+            author.get_full_name(),
+            group and group.slug,
+            group and group.title,
+        )
+
 
 class Group (models.Model):
     title = models.CharField(
@@ -56,6 +130,16 @@ class Group (models.Model):
     description = models.TextField(
         verbose_name='Описание'
     )
+    posts_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Количество постов',
+    )
+    followers_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Количество подписчиков',
+    )
 
     class Meta:
         verbose_name = 'Название группы'
@@ -63,3 +147,165 @@ class Group (models.Model):
 
     def __str__(self) -> str:
         return self.title
+
+
+class SiteStats(models.Model):
+    """Счётчики всего сайта, одна строка. Число постов ведут те же
+    триггеры, что и счётчики авторов и групп."""
+
+    posts_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Количество постов',
+    )
+
+    class Meta:
+        verbose_name = 'Статистика сайта'
+        verbose_name_plural = 'Статистика сайта'
+
+    def __str__(self) -> str:
+        return f'Постов: {self.posts_count}'
+
+    @classmethod
+    def get_posts_count(cls):
+        """Число постов или None, если строки ещё нет."""
+        return cls.objects.filter(pk=1).values_list(
+            'posts_count', flat=True).first()
+
+
+class AuthorStats(models.Model):
+    author = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name='stats',
+        verbose_name='Автор',
+    )
+    posts_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Количество постов',
+    )
+    followers_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Количество подписчиков',
+    )
+
+    class Meta:
+        verbose_name = 'Статистика автора'
+        verbose_name_plural = 'Статистика авторов'
+
+    def __str__(self) -> str:
+        return f'{self.author}: {self.posts_count}'
+
+    @classmethod
+    def get_posts_count(cls, author):
+        stats = cls.objects.filter(author=author)
+        return stats.values_list('posts_count', flat=True).first() or 0
+
+    @classmethod
+    def get_profile_stats(cls, author, user):
+        """Число постов автора и подписан ли на него user, одним
+        запросом. Строки статистики нет, пока у автора нет ни постов,
+        ни подписчиков, тогда и подписки нет."""
+        stats = cls.objects.filter(author=author)
+        if not user.is_authenticated or user.pk == author.pk:
+            return cls.get_posts_count(author), False
+        row = stats.annotate(following=models.Exists(Follow.objects.filter(
+            user=user, author=models.OuterRef('author_id')))).values_list(
+                'posts_count', 'following').first()
+        if row is None:
+            return 0, False
+        return row[0], bool(row[1])
+
+
+class Follow(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='follower',
+        verbose_name='Подписчик',
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        blank=True,
+        null=True,
+        related_name='following',
+        verbose_name='Автор',
+    )
+    group = models.ForeignKey(
+        Group,
+        on_delete=models.CASCADE,
+        blank=True,
+        null=True,
+        related_name='followers',
+        verbose_name='Группа',
+    )
+
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'author'),
+                name='follow_unique_author',
+            ),
+            models.UniqueConstraint(
+                fields=('user', 'group'),
+                name='follow_unique_group',
+            ),
+            models.CheckConstraint(
+                check=(models.Q(author__isnull=False, group__isnull=True)
+                       | models.Q(author__isnull=True, group__isnull=False)),
+                name='follow_author_or_group',
+            ),
+        )
+        verbose_name = 'Подписка'
+        verbose_name_plural = 'Подписки'
+
+    def __str__(self) -> str:
+        return f'{self.user} -> {self.author or self.group}'
+
+    def save(self, *args, **kwargs):
+        # Счётчик подписчиков и задача дополнения ленты меняются
+        # из post_save в той же транзакции, что и подписка.
+        with transaction.atomic(savepoint=False):
+            super().save(*args, **kwargs)
+
+
+class TimelineEntry(models.Model):
+    """Пост в ленте подписок пользователя. Дата публикации повторяет
+    дату поста, чтобы страница ленты читалась одним диапазоном
+    индекса (user, pub_date, post)."""
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        db_index=False,
+        related_name='timeline',
+        verbose_name='Читатель',
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        verbose_name='Пост',
+    )
+    pub_date = models.DateTimeField(
+        verbose_name='Дата публикации',
+    )
+
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'post'),
+                name='timeline_unique_post',
+            ),
+        )
+        indexes = (
+            models.Index(
+                fields=('user', '-pub_date', '-post'),
+                name='timeline_user_pub_date_idx',
+            ),
+        )
+        verbose_name = 'Запись ленты подписок'
+        verbose_name_plural = 'Записи лент подписок'
+
+    def __str__(self) -> str:
+        return f'{self.user}: {self.post_id}'
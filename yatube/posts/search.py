@@ -0,0 +1,74 @@
+import re
+
+from django.db import connection
+from django.db.models.expressions import RawSQL
+
+from .models import Post
+from .triggers import SEARCH_TABLE
+
+WORD_PATTERN = re.compile(r'\w+')
+
+
+def build_match_query(query):
+    """Превращает ввод пользователя в безопасный запрос FTS5:
+    каждое слово ищется как префикс, все слова обязательны."""
+    words = WORD_PATTERN.findall(query or '')
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def search_post_ids(query):
+    return RawSQL(
+        f'SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s',
+        (build_match_query(query),),
+    )
+
+
+class SearchResults:
+    """Ранжированные результаты полнотекстового поиска.
+
+    Поддерживает count() и срезы, поэтому передаётся в Paginator как
+    обычный queryset.
+    """
+
+    def __init__(self, query):
+        self.match = build_match_query(query)
+
+    def count(self):
+        if not self.match:
+            return 0
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT COUNT(*) FROM {SEARCH_TABLE} '
+                f'WHERE {SEARCH_TABLE} MATCH %s',
+                (self.match,),
+            )
+            return cursor.fetchone()[0]
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, (int, slice)):
+            raise TypeError
+        assert ((not isinstance(index, slice) and index >= 0) or (
+            isinstance(index, slice)
+            and (index.start is None or index.start >= 0)
+            and (index.stop is None or index.stop >= 0)
+        )), 'Negative indexing is not supported.'
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        if not self.match:
+            return []
+        start = index.start or 0
+        # LIMIT -1 в SQLite означает «без ограничения».
+        limit = -1 if index.stop is None else max(index.stop - start, 0)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {SEARCH_TABLE} '
+                f'WHERE {SEARCH_TABLE} MATCH %s '
+                'ORDER BY rank LIMIT %s OFFSET %s',
+                (self.match, limit, start),
+            )
+            ids = [row[0] for row in cursor.fetchall()]
+        posts = Post.objects.select_related('author', 'group').in_bulk(ids)
+        return [posts[pk] for pk in ids if pk in posts]
@@ -0,0 +1,172 @@
+from django.db.models.signals import (
+    post_delete, post_save, pre_delete, pre_save
+)
+from django.dispatch import receiver
+
+from .cache import (
+    bump_feed_versions, forget_post_validator, group_feed, index_feed,
+    profile_feed
+)
+from .lookups import author_lookup, existence, group_lookup
+from .models import AuthorStats, Follow, Group, Post, User
+from .timeline import fan_out_posts, follow_added, follow_removed
+
+
+def get_post_feeds(post):
+    feeds = [index_feed(), profile_feed(post.author.username)]
+    if post.group is not None:
+        feeds.append(group_feed(post.group.slug))
+    return feeds
+
+
+@receiver(pre_save, sender=Post)
+def remember_post_feeds(sender, instance, raw=False, **kwargs):
+    instance._previous_feeds = []
+    instance._previous_group_id = None
+    if raw:
+        return
+    if instance.pk is None:
+        existence.record('post')
+        return
+    previous = Post.objects.select_related('author', 'group').filter(
+        pk=instance.pk).first()
+    if previous is not None:
+        instance._previous_feeds = get_post_feeds(previous)
+        instance._previous_group_id = previous.group_id
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post_feeds(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    forget_post_validator(instance.pk)
+    created = kwargs.get('created')
+    if created:
+        existence.record('post', instance.pk)
+    moved = (kwargs['signal'] is post_save and not created
+             and getattr(instance, '_previous_group_id', None)
+             != instance.group_id)
+    if created or moved:
+        fan_out_posts.enqueue(instance.pk, key=f'fan-out:{instance.pk}')
+    bump_feed_versions(
+        *get_post_feeds(instance),
+        *getattr(instance, '_previous_feeds', ()),
+    )
+
+
+def get_group_feeds(group, slug=None):
+    authors = User.objects.filter(posts__group=group).distinct()
+    return [
+        index_feed(),
+        group_feed(group.slug),
+        group_feed(slug),
+        *(profile_feed(username)
+          for username in authors.values_list('username', flat=True)),
+    ]
+
+
+def get_author_feeds(author):
+    groups = Group.objects.filter(posts__author=author).distinct()
+    return [
+        index_feed(),
+        profile_feed(author.username),
+        *(group_feed(slug)
+          for slug in groups.values_list('slug', flat=True)),
+    ]
+
+
+@receiver(pre_save, sender=Group)
+def remember_group_slug(sender, instance, raw=False, **kwargs):
+    instance._previous_slug = None
+    if not raw and instance.pk is not None:
+        instance._previous_slug = Group.objects.filter(
+            pk=instance.pk).values_list('slug', flat=True).first()
+    if not raw and instance._previous_slug != instance.slug:
+        existence.record('group', instance.slug)
+
+
+@receiver(post_save, sender=Group)
+def invalidate_saved_group_feeds(sender, instance, raw=False, **kwargs):
+    if not raw:
+        previous_slug = getattr(instance, '_previous_slug', None)
+        group_lookup.evict(instance.slug, previous_slug)
+        if previous_slug != instance.slug:
+            existence.record('group', instance.slug)
+        bump_feed_versions(*get_group_feeds(instance, previous_slug))
+
+
+@receiver(pre_delete, sender=Group)
+def invalidate_deleted_group_feeds(sender, instance, **kwargs):
+    group_lookup.evict(instance.slug)
+    bump_feed_versions(*get_group_feeds(instance))
+
+
+# Поля автора, которые показываются в карточках постов.
+AUTHOR_DISPLAY_FIELDS = ('username', 'first_name', 'last_name')
+
+
+def get_author_display(author):
+    return tuple(getattr(author, field) for field in AUTHOR_DISPLAY_FIELDS)
+
+
+@receiver(pre_save, sender=User)
+def remember_author_username(sender, instance, raw=False,
+                             update_fields=None, **kwargs):
+    instance._previous_display = None
+    if raw or update_fields == frozenset(('last_login',)):
+        return
+    if instance.pk is not None:
+        instance._previous_display = User.objects.filter(
+            pk=instance.pk).values_list(*AUTHOR_DISPLAY_FIELDS).first()
+    if (instance._previous_display or (None,))[0] != instance.username:
+        existence.record('author', instance.username)
+
+
+@receiver(post_save, sender=User)
+def invalidate_saved_author_feeds(sender, instance, raw=False,
+                                  update_fields=None, created=False,
+                                  **kwargs):
+    """Лента профиля меняет версию при любом сохранении: по ней
+    проверяются закешированные авторы. Общая лента и ленты групп —
+    только когда изменилось показанное в карточках имя автора,
+    у которого есть посты, а не при регистрации или смене пароля."""
+    if raw or update_fields == frozenset(('last_login',)):
+        return
+    previous = getattr(instance, '_previous_display', None)
+    previous_username = previous[0] if previous else None
+    author_lookup.evict(instance.username, previous_username)
+    if previous_username != instance.username:
+        existence.record('author', instance.username)
+    feeds = [profile_feed(instance.username), profile_feed(previous_username)]
+    if (not created and previous != get_author_display(instance)
+            and AuthorStats.objects.filter(
+                author=instance, posts_count__gt=0).exists()):
+        feeds.extend(get_author_feeds(instance))
+    bump_feed_versions(*feeds)
+
+
+@receiver(pre_delete, sender=User)
+def invalidate_deleted_author_feeds(sender, instance, **kwargs):
+    author_lookup.evict(instance.username)
+    bump_feed_versions(*get_author_feeds(instance))
+
+
+def get_follow_feed(follow):
+    if follow.author_id is not None:
+        return profile_feed(follow.author.username)
+    return group_feed(follow.group.slug)
+
+
+@receiver(post_save, sender=Follow)
+def add_follow_to_timeline(sender, instance, created, raw=False, **kwargs):
+    if raw or not created:
+        return
+    follow_added(instance)
+    bump_feed_versions(get_follow_feed(instance))
+
+
+@receiver(post_delete, sender=Follow)
+def remove_follow_from_timeline(sender, instance, **kwargs):
+    follow_removed(instance)
+    bump_feed_versions(get_follow_feed(instance))
@@ -0,0 +1,86 @@
+import os
+import time
+from http import HTTPStatus
+
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from ..models import Group, Post, User
+
+BENCHMARK_POSTS = int(os.getenv('ADMIN_BENCHMARK_POSTS', 20000))
+BENCHMARK_MAX_SECONDS = float(os.getenv('ADMIN_BENCHMARK_MAX_SECONDS', 2))
+CHANGELIST_QUERY_BUDGET = 10
+
+
+class PostAdminBenchmarkTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass')
+        groups = Group.objects.bulk_create(
+            Group(title=f'Группа {number}', slug=f'group-{number}')
+            for number in range(50)
+        )
+        Post.objects.bulk_create(
+            Post(text=f'Тестовый пост {number}',
+                 author=cls.admin,
+                 group=groups[number % len(groups)])
+            for number in range(BENCHMARK_POSTS)
+        )
+
+    def setUp(self):
+        self.admin_client = Client()
+        self.admin_client.force_login(self.admin)
+
+    def test_changelist_query_count_and_time(self):
+        """Список постов в админке укладывается в бюджет запросов
+        и времени на большой таблице."""
+        url = reverse('admin:posts_post_changelist')
+        started = time.perf_counter()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.admin_client.get(url)
+        elapsed = time.perf_counter() - started
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertLessEqual(len(queries), CHANGELIST_QUERY_BUDGET,
+                             [query['sql'] for query in queries])
+        self.assertLess(elapsed, BENCHMARK_MAX_SECONDS)
+        for query in queries.captured_queries:
+            self.assertNotIn('COUNT(*) AS "__count" FROM "posts_post"'
+                             ' INNER', query['sql'])
+            self.assertNotRegex(
+                query['sql'], r'COUNT\(\*\) AS "__count" FROM "posts_post"$')
+
+    def test_date_hierarchy_does_not_scan_table(self):
+        """Иерархия дат строится по MIN и MAX, без DISTINCT по усечённым
+        датам всей таблицы, на каждом уровне."""
+        url = reverse('admin:posts_post_changelist')
+        today = timezone.localdate()
+        levels = (
+            ({}, f'pub_date__day={today.day}'),
+            ({'pub_date__year': today.year},
+             f'pub_date__month={today.month}'),
+            ({'pub_date__year': today.year, 'pub_date__month': today.month},
+             f'pub_date__day={today.day}'),
+        )
+        for params, link in levels:
+            with self.subTest(params=params):
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.admin_client.get(url, params)
+                self.assertContains(response, link)
+                for query in queries.captured_queries:
+                    self.assertNotIn('DISTINCT django_date_trunc',
+                                     query['sql'])
+
+    def test_change_form_does_not_list_users(self):
+        """Форма поста не загружает всех пользователей в список."""
+        post = Post.objects.first()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.admin_client.get(
+                reverse('admin:posts_post_change', args=(post.pk,)))
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        for query in queries.captured_queries:
+            self.assertNotRegex(query['sql'], r'FROM "auth_user"\s*$')
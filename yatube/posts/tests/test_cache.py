@@ -0,0 +1,436 @@
+from http import HTTPStatus
+
+from django.core.cache import cache
+from django.http import Http404
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..cache import bump_feed_versions, group_feed
+from ..lookups import (
+    BloomFilter, LookupCache, author_lookup, existence, group_lookup
+)
+from ..models import Group, Post, User
+
+
+class FeedPageCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='random_name')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_group',
+            description='Тестовое описание группы',
+        )
+        cls.other_group = Group.objects.create(
+            title='Другая группа',
+            slug='other_group',
+            description='Тестовое описание группы',
+        )
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text='Тестовый пост',
+            group=cls.group,
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_anonymous_feed_is_cached(self):
+        """Повторный анонимный запрос ленты не обращается к базе."""
+        urls = (
+            reverse('posts:main_page'),
+            reverse('posts:group_list', args=(self.group.slug,)),
+            reverse('posts:profile', args=(self.user.username,)),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                with self.assertNumQueries(0):
+                    cached_response = self.client.get(url)
+                self.assertEqual(cached_response.content, response.content)
+
+    def test_authorized_feed_is_not_cached(self):
+        """Страницы авторизованного пользователя не кешируются."""
+        url = reverse('posts:main_page')
+        self.authorized_client.get(url)
+        response = self.authorized_client.get(url)
+        self.assertIsNotNone(response.context)
+
+    def test_post_create_invalidates_only_its_feeds(self):
+        """Новый пост сбрасывает кеш только своих лент."""
+        group_url = reverse('posts:group_list', args=(self.group.slug,))
+        other_url = reverse('posts:group_list', args=(self.other_group.slug,))
+        self.client.get(group_url)
+        self.client.get(other_url)
+        self.authorized_client.post(
+            reverse('posts:post_create'),
+            data={'text': 'Новый пост', 'group': self.group.pk},
+        )
+        response = self.client.get(group_url)
+        self.assertContains(response, 'Новый пост')
+        with self.assertNumQueries(0):
+            self.client.get(other_url)
+
+    def test_user_save_invalidates_shown_names_only(self):
+        """Регистрация и смена пароля не сбрасывают общую ленту,
+        смена имени автора с постами сбрасывает."""
+        url = reverse('posts:main_page')
+        self.client.get(url)
+        reader = User.objects.create_user(username='reader')
+        reader.set_password('new-password')
+        reader.first_name = 'Читатель'
+        reader.save()
+        self.user.set_password('new-password')
+        self.user.save()
+        with self.assertNumQueries(0):
+            self.client.get(url)
+        self.user.first_name = 'Лев'
+        self.user.save()
+        self.assertContains(self.client.get(url), 'Лев')
+
+    def test_post_edit_invalidates_previous_group(self):
+        """Перенос поста в другую группу сбрасывает обе ленты."""
+        group_url = reverse('posts:group_list', args=(self.group.slug,))
+        self.client.get(group_url)
+        self.authorized_client.post(
+            reverse('posts:post_edit', args=(self.post.pk,)),
+            data={'text': 'Тестовый пост', 'group': self.other_group.pk},
+        )
+        response = self.client.get(group_url)
+        self.assertEqual(len(response.context['page_obj']), 0)
+
+
+class PostCardCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='random_name')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_group',
+            description='Тестовое описание группы',
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.post = Post.objects.create(
+            author=self.user,
+            text='Тестовый пост',
+            group=self.group,
+        )
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_card_is_rendered_from_cache(self):
+        """Карточка поста берётся из кеша, пока версия не изменилась."""
+        url = reverse('posts:main_page')
+        self.authorized_client.get(url)
+        Post.objects.filter(pk=self.post.pk).update(text='Без новой версии')
+        response = self.authorized_client.get(url)
+        self.assertContains(response, 'Тестовый пост')
+
+    def test_card_version_changes(self):
+        """Правка поста, имени автора или группы обновляет карточку."""
+        url = reverse('posts:main_page')
+        changes = (
+            (self.post, 'text', 'Исправленный текст'),
+            (self.user, 'first_name', 'Лев'),
+            (self.group, 'title', 'Переименованная группа'),
+        )
+        for instance, field, value in changes:
+            with self.subTest(field=field):
+                self.authorized_client.get(url)
+                setattr(instance, field, value)
+                instance.save()
+                self.post.refresh_from_db()
+                self.assertContains(self.authorized_client.get(url), value)
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='random_name')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_group',
+            description='Тестовое описание группы',
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.post = Post.objects.create(
+            author=self.user,
+            text='Тестовый пост',
+            group=self.group,
+        )
+
+    def test_feed_not_modified(self):
+        """Лента отвечает 304 без запросов к базе, пока не изменилась."""
+        urls = (
+            reverse('posts:main_page'),
+            reverse('posts:group_list', args=(self.group.slug,)),
+            reverse('posts:profile', args=(self.user.username,)),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                etag = self.client.get(url)['ETag']
+                with self.assertNumQueries(0):
+                    response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code,
+                                 HTTPStatus.NOT_MODIFIED)
+        etag = self.client.get(urls[1])['ETag']
+        Post.objects.create(author=self.user, text='Новый пост',
+                            group=self.group)
+        response = self.client.get(urls[1], HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_post_detail_not_modified(self):
+        """Страница поста отвечает 304, пока пост и автор не изменились."""
+        url = reverse('posts:post_detail', args=(self.post.pk,))
+        self.client.get(url)
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+        Post.objects.create(author=self.user, text='Ещё один пост')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(response.context['posts_count'], 2)
+
+    def test_new_login_gets_new_etag(self):
+        """После нового входа страницы с формами не отвечают 304:
+        в закешированной браузером странице старый CSRF-токен."""
+        urls = (
+            reverse('posts:group_list', args=(self.group.slug,)),
+            reverse('posts:profile', args=(self.user.username,)),
+            reverse('posts:post_detail', args=(self.post.pk,)),
+        )
+        reader = User.objects.create_user(username='reader')
+        for url in urls:
+            with self.subTest(url=url):
+                self.client.force_login(reader)
+                # Первый ответ выставляет CSRF-cookie.
+                self.client.get(url)
+                etag = self.client.get(url)['ETag']
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code,
+                                 HTTPStatus.NOT_MODIFIED)
+                self.client.logout()
+                self.client.force_login(reader)
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+                self.assertNotEqual(response['ETag'], etag)
+
+    def test_validators_before_first_render(self):
+        """Первый ответ уже несёт ETag, а несуществующие группа, автор
+        и пост отвечают 404, а не 304."""
+        url = reverse('posts:post_detail', args=(self.post.pk,))
+        etag = self.client.get(url)['ETag']
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+        urls = (
+            reverse('posts:group_list', args=('missing',)),
+            reverse('posts:profile', args=('missing',)),
+            reverse('posts:group_feed', args=('missing',)),
+            reverse('posts:post_detail', args=(self.post.pk + 100,)),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+                self.assertFalse(response.has_header('ETag'))
+                response = self.client.get(url, HTTP_IF_NONE_MATCH='*')
+                self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+
+class LookupCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='random_name')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_group',
+            description='Тестовое описание группы',
+        )
+
+    def setUp(self):
+        cache.clear()
+        group_lookup.clear()
+        author_lookup.clear()
+
+    def test_views_reuse_lookups(self):
+        """Повторный запрос ленты группы и профиля не ищет их в базе."""
+        client = Client()
+        client.force_login(self.user)
+        urls = (
+            reverse('posts:group_list', args=(self.group.slug,)),
+            reverse('posts:profile', args=(self.user.username,)),
+        )
+        for url in urls:
+            client.get(url)
+        self.assertEqual(group_lookup.stats()['misses'], 1)
+        self.assertEqual(author_lookup.stats()['misses'], 1)
+        for url in urls:
+            client.get(url)
+        self.assertEqual(group_lookup.stats()['misses'], 1)
+        self.assertEqual(author_lookup.stats()['misses'], 1)
+
+    def test_lookup_invalidation(self):
+        """Запись сбрасывается при сохранении, по версии из общего
+        кеша и по TTL."""
+        group_lookup.get(self.group.slug)
+        self.group.title = 'Переименованная группа'
+        self.group.save()
+        self.assertEqual(group_lookup.get(self.group.slug).title,
+                         'Переименованная группа')
+        bump_feed_versions(group_feed(self.group.slug))
+        group_lookup.get(self.group.slug)
+        self.assertEqual(group_lookup.stats()['misses'], 3)
+        with self.assertNumQueries(0):
+            group_lookup.get(self.group.slug)
+        lookup = LookupCache('group', Group, 'slug', group_feed,
+                             maxsize=1, ttl=0)
+        lookup.get(self.group.slug)
+        lookup.get(self.group.slug)
+        self.assertEqual(lookup.stats(), {'hits': 0, 'misses': 2, 'size': 1})
+
+    def test_missing_object_raises_404(self):
+        """Несуществующий slug даёт 404 и не кешируется."""
+        with self.assertRaises(Http404):
+            group_lookup.get('missing')
+        self.assertEqual(group_lookup.stats()['size'], 0)
+
+    def test_renamed_author_is_evicted(self):
+        """После смены username старый адрес профиля отдаёт 404."""
+        author_lookup.get(self.user.username)
+        self.user.username = 'new_name'
+        self.user.save()
+        with self.assertRaises(Http404):
+            author_lookup.get('random_name')
+        self.user.username = 'random_name'
+        self.user.save()
+
+
+class NegativeLookupTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='random_name')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_group',
+            description='Тестовое описание группы',
+        )
+        cls.post = Post.objects.create(author=cls.user, text='Тестовый пост')
+
+    def setUp(self):
+        cache.clear()
+        group_lookup.clear()
+        author_lookup.clear()
+        existence.invalidate()
+
+    def test_missing_objects_skip_database(self):
+        """Несуществующие группа, автор и пост отдают 404 без запросов
+        к базе."""
+        urls = (
+            reverse('posts:group_list', args=('missing',)),
+            reverse('posts:profile', args=('missing',)),
+            reverse('posts:post_detail', args=(self.post.pk + 1000,)),
+        )
+        existence.rebuild()
+        for url in urls:
+            with self.subTest(url=url):
+                with self.assertNumQueries(0):
+                    response = self.client.get(url)
+                self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    def test_repeated_miss_is_cached(self):
+        """Промах мимо фильтра запоминается ненадолго."""
+        Post.objects.filter(pk=self.post.pk).delete()
+        url = reverse('posts:post_detail', args=(self.post.pk,))
+        existence.rebuild()
+        self.assertEqual(self.client.get(url).status_code,
+                         HTTPStatus.NOT_FOUND)
+        with self.assertNumQueries(0):
+            self.client.get(url)
+
+    def test_new_objects_are_found(self):
+        """Созданные после построения фильтра объекты находятся,
+        в том числе добавленные через bulk_create."""
+        existence.rebuild()
+        self.client.get(reverse('posts:profile', args=('new_author',)))
+        author = User.objects.create_user(username='new_author')
+        post = Post.objects.create(author=author, text='Новый пост')
+        Post.objects.bulk_create([Post(author=author, text='Ещё пост')])
+        bulk_post = Post.objects.latest('pk')
+        urls = (
+            reverse('posts:profile', args=(author.username,)),
+            reverse('posts:post_detail', args=(post.pk,)),
+            reverse('posts:post_detail', args=(bulk_post.pk,)),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code,
+                                 HTTPStatus.OK)
+
+    def test_new_objects_survive_cache_loss(self):
+        """Объект, созданный после построения фильтра, находится,
+        даже если общий кеш потерял метки корзин."""
+        existence.rebuild()
+        User.objects.create_user(username='new_author')
+        Group.objects.create(title='Новая группа', slug='new_group')
+        cache.clear()
+        urls = (
+            reverse('posts:profile', args=('new_author',)),
+            reverse('posts:group_list', args=('new_group',)),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code,
+                                 HTTPStatus.OK)
+
+    def test_cached_miss_is_dropped_on_create(self):
+        """Запомненный промах не скрывает созданный затем объект."""
+        url = reverse('posts:profile', args=('new_author',))
+        existence.rebuild()
+        self.assertEqual(self.client.get(url).status_code,
+                         HTTPStatus.NOT_FOUND)
+        User.objects.create_user(username='new_author')
+        self.assertEqual(self.client.get(url).status_code, HTTPStatus.OK)
+
+    def test_requests_do_not_build_index(self):
+        """Пока индекс не построен, запросы идут в базу, но не строят
+        его; массовая вставка постов не сбрасывает фильтры групп
+        и авторов."""
+        url = reverse('posts:group_list', args=('missing',))
+        self.assertEqual(self.client.get(url).status_code,
+                         HTTPStatus.NOT_FOUND)
+        self.assertEqual(existence.tokens, {})
+        existence.rebuild()
+        Post.objects.bulk_create([Post(author=self.user, text='Ещё пост')])
+        self.assertEqual(existence.outdated_kinds(), [])
+        with self.assertNumQueries(0):
+            self.client.get(reverse('posts:group_list', args=('other',)))
+        response = self.client.get(reverse(
+            'posts:post_detail', args=(Post.objects.latest('pk').pk,)))
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(existence.outdated_kinds(), ['post'])
+        existence.rebuild(existence.outdated_kinds())
+        self.assertEqual(existence.max_post_id,
+                         Post.objects.latest('pk').pk)
+
+    def test_bloom_filter(self):
+        """Фильтр Блума не теряет добавленные значения."""
+        bloom = BloomFilter(1000, 0.01)
+        for number in range(1000):
+            bloom.add(f'user_{number}')
+        self.assertTrue(all(f'user_{number}' in bloom
+                            for number in range(1000)))
+        false_positives = sum(f'other_{number}' in bloom
+                              for number in range(10000))
+        self.assertLess(false_positives, 300)
@@ -0,0 +1,165 @@
+import json
+import os
+import tempfile
+from datetime import datetime
+from http import HTTPStatus
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from ..models import AuthorStats, Group, Post, User
+
+
+class ImportPostsCommandTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='random_name')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_group',
+            description='Тестовое описание группы',
+        )
+
+    def write_file(self, suffix, content):
+        handle, path = tempfile.mkstemp(suffix=suffix)
+        with os.fdopen(handle, 'w', encoding='utf-8') as stream:
+            stream.write(content)
+        self.addCleanup(os.remove, path)
+        return path
+
+    def test_import_jsonl(self):
+        '''Импорт JSONL сохраняет даты, группы и пропускает чужих авторов'''
+        rows = (
+            {'text': 'Первый', 'author': 'random_name',
+             'group': 'test_group', 'pub_date': '2020-01-02T03:04:05'},
+            {'text': 'Второй', 'author': 'random_name'},
+            {'text': 'Без автора', 'author': 'nobody'},
+        )
+        path = self.write_file(
+            '.jsonl', '\n'.join(json.dumps(row) for row in rows))
+        call_command('import_posts', path, stdout=StringIO(),
+                     stderr=StringIO())
+        self.assertEqual(Post.objects.count(), 2)
+        post = Post.objects.get(text='Первый')
+        self.assertEqual(post.group, self.group)
+        self.assertEqual(
+            post.pub_date,
+            timezone.make_aware(datetime(2020, 1, 2, 3, 4, 5))
+        )
+        self.assertEqual(AuthorStats.get_posts_count(self.user), 2)
+        self.assertTrue(Post._meta.get_field('pub_date').auto_now_add)
+
+    def test_import_skips_bad_rows(self):
+        '''Битые строки и даты пропускаются и считаются, остальное
+        импортируется'''
+        lines = (
+            json.dumps({'text': 'Первый', 'author': 'random_name'}),
+            '{"text": "Оборванная строка',
+            json.dumps(['не', 'словарь']),
+            json.dumps({'text': 'Дата числом', 'author': 'random_name',
+                        'pub_date': 20200102}),
+            json.dumps({'text': 'Нет такой даты', 'author': 'random_name',
+                        'pub_date': '2020-13-45T00:00:00'}),
+            json.dumps({'text': 'Последний', 'author': 'random_name'}),
+        )
+        path = self.write_file('.jsonl', '\n'.join(lines))
+        stdout = StringIO()
+        call_command('import_posts', path, chunk_size=2, stdout=stdout,
+                     stderr=StringIO())
+        self.assertEqual(
+            sorted(Post.objects.values_list('text', flat=True)),
+            ['Первый', 'Последний'])
+        self.assertIn('пропущено 4', stdout.getvalue())
+
+    def test_import_csv_in_chunks(self):
+        '''Импорт CSV проходит по частям'''
+        path = self.write_file('.csv', 'text,author,group\n' + ''.join(
+            f'Пост {number},random_name,test_group\n'
+            for number in range(25)
+        ))
+        call_command('import_posts', path, chunk_size=10,
+                     stdout=StringIO(), stderr=StringIO())
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 25)
+
+
+class ExportPostsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='random_name')
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_group',
+            description='Тестовое описание группы',
+        )
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text='Тестовый пост',
+            group=cls.group,
+        )
+        Post.objects.create(author=cls.admin, text='Пост администратора')
+
+    def test_export_command_filters_posts(self):
+        '''Команда export_posts выгружает посты с фильтрами'''
+        out = StringIO()
+        call_command('export_posts', author='random_name', stdout=out)
+        rows = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual(rows, [{
+            'id': self.post.pk,
+            'text': self.post.text,
+            'pub_date': self.post.pub_date.isoformat(),
+            'author': 'random_name',
+            'group': 'test_group',
+        }])
+        out = StringIO()
+        call_command('export_posts', format='csv', until='2000-01-01',
+                     stdout=out)
+        self.assertEqual(out.getvalue().splitlines(),
+                         ['id,text,pub_date,author,group'])
+
+    def test_export_view_streams_for_staff_only(self):
+        '''Выгрузка по HTTP доступна только сотрудникам'''
+        url = reverse('posts:export')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, HTTPStatus.FOUND)
+        self.client.force_login(self.admin)
+        response = self.client.get(url, {'format': 'csv',
+                                         'group': 'test_group'})
+        self.assertTrue(response.streaming)
+        content = b''.join(response.streaming_content).decode()
+        self.assertEqual(len(content.splitlines()), 2)
+        self.assertIn('Тестовый пост', content)
+
+
+class GenerateDataTests(TestCase):
+
+    def test_generate_data(self):
+        """Команда создаёт данные, пересчитывает счётчики и индекс
+        и возвращает триггеры на место."""
+        call_command('generate_data', users=5, groups=3, posts=250,
+                     batch_size=100, transaction_size=200,
+                     stdout=StringIO())
+        self.assertEqual(Post.objects.count(), 250)
+        self.assertEqual(
+            sum(AuthorStats.objects.values_list('posts_count', flat=True)),
+            250)
+        self.assertEqual(
+            sum(Group.objects.values_list('posts_count', flat=True)),
+            Post.objects.filter(group__isnull=False).count())
+        dates = list(Post.objects.values_list('pub_date', flat=True))
+        self.assertEqual(dates, sorted(dates, reverse=True))
+        self.assertTrue(all(Post.objects.values_list('excerpt', flat=True)))
+        author = User.objects.get(username='gen_user_1')
+        Post.objects.create(author=author, text='уникальноеслово')
+        self.assertEqual(AuthorStats.get_posts_count(author),
+                         author.posts.count())
+        response = self.client.get(reverse('posts:search'),
+                                   {'q': 'уникальноеслово'})
+        self.assertEqual(len(response.context['page_obj']), 1)
@@ -0,0 +1,73 @@
+from http import HTTPStatus
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from ..models import Group, Post, User
+
+
+class AtomFeedTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='random_name')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_group',
+            description='Тестовое описание группы',
+        )
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text='Пост в группе',
+            group=cls.group,
+        )
+        cls.other_post = Post.objects.create(
+            author=cls.user,
+            text='Пост без группы',
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_feeds_contain_their_posts(self):
+        """Ленты Atom содержат посты своей ленты."""
+        feeds = (
+            (reverse('posts:feed'), (self.post, self.other_post)),
+            (reverse('posts:group_feed', args=(self.group.slug,)),
+             (self.post,)),
+            (reverse('posts:profile_feed', args=(self.user.username,)),
+             (self.post, self.other_post)),
+        )
+        for url, posts in feeds:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+                self.assertTrue(
+                    response['Content-Type'].startswith(
+                        'application/atom+xml'))
+                self.assertEqual(response.content.count(b'<entry>'),
+                                 len(posts))
+                for post in posts:
+                    self.assertContains(response, post.text)
+
+    def test_feed_is_cached_and_invalidated(self):
+        """Лента отдаётся из кеша и обновляется после изменения поста."""
+        url = reverse('posts:group_feed', args=(self.group.slug,))
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(0):
+            self.client.get(url)
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = 'Исправленный пост'
+        post.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertContains(response, 'Исправленный пост')
+
+    def test_unknown_group_feed(self):
+        """Лента несуществующей группы отвечает 404."""
+        response = self.client.get(
+            reverse('posts:group_feed', args=('unknown',)))
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
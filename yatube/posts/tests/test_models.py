@@ -1,7 +1,10 @@
+from io import StringIO
+
 from django.conf import settings
+from django.core.management import call_command
 from django.test import TestCase
 
-from ..models import Group, Post, User
+from ..models import AuthorStats, Follow, Group, Post, User
 
 LEN_OF_POSTS = settings.LEN_OF_POSTS
 
@@ -60,3 +63,95 @@ class PostModelTest(TestCase):
                 self.assertEqual(
                     self.post._meta.get_field(field).help_text,
                     expected_value, error_name)
+
+
+class PostCountersTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='random_name')
+        self.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_group',
+            description='Тестовое описание группы',
+        )
+        self.group2 = Group.objects.create(
+            title='Тестовая группа 2',
+            slug='test_group2',
+            description='Тестовое описание группы',
+        )
+
+    def assertCounters(self, author_count, group_count, group2_count):
+        self.group.refresh_from_db()
+        self.group2.refresh_from_db()
+        self.assertEqual(AuthorStats.get_posts_count(self.user),
+                         author_count)
+        self.assertEqual(self.group.posts_count, group_count)
+        self.assertEqual(self.group2.posts_count, group2_count)
+
+    def test_counters_follow_post_changes(self):
+        '''Счётчики обновляются при создании, смене группы и удалении'''
+        post = Post.objects.create(author=self.user, text='Тестовый пост',
+                                   group=self.group)
+        Post.objects.create(author=self.user, text='Без группы')
+        self.assertCounters(2, 1, 0)
+        post.group = self.group2
+        post.save()
+        self.assertCounters(2, 0, 1)
+        post.delete()
+        self.assertCounters(1, 0, 0)
+
+    def test_rebuild_post_counters_command(self):
+        '''Команда rebuild_post_counters восстанавливает счётчики'''
+        Post.objects.create(author=self.user, text='Тестовый пост',
+                            group=self.group)
+        AuthorStats.objects.all().delete()
+        Group.objects.update(posts_count=0)
+        call_command('rebuild_post_counters', stdout=StringIO())
+        self.assertCounters(1, 1, 0)
+
+    def test_rebuild_followers_counters(self):
+        '''Команда rebuild_post_counters восстанавливает счётчики
+        подписчиков'''
+        reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=reader, author=self.user)
+        Follow.objects.create(user=reader, group=self.group)
+        AuthorStats.objects.update(followers_count=5)
+        Group.objects.update(followers_count=5)
+        call_command('rebuild_post_counters', stdout=StringIO())
+        self.assertEqual(AuthorStats.objects.get(
+            author=self.user).followers_count, 1)
+        self.assertEqual(AuthorStats.objects.get(
+            author=reader).followers_count, 0)
+        self.assertEqual(list(Group.objects.order_by('pk').values_list(
+            'followers_count', flat=True)), [1, 0])
+
+
+class PostRenderedTextTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='random_name')
+
+    def test_rendered_text_follows_post_text(self):
+        '''Анонс и HTML-текст пересчитываются при сохранении поста'''
+        post = Post.objects.create(author=self.user, text='<b>Первый</b>\n\n'
+                                   + ' '.join(['слово'] * 20))
+        self.assertTrue(post.excerpt.endswith('…'))
+        self.assertIn('&lt;b&gt;Первый&lt;/b&gt;', post.text_html)
+        self.assertEqual(post.text_html.count('<p>'), 2)
+        post.text = 'Новый текст'
+        post.save(update_fields=('text',))
+        post.refresh_from_db()
+        self.assertEqual(post.excerpt, 'Новый текст')
+        self.assertEqual(post.text_html, '<p>Новый текст</p>')
+
+    def test_render_posts_command(self):
+        '''Команда render_posts заполняет анонс у постов из bulk_create'''
+        Post.objects.bulk_create(
+            Post(author=self.user, text=f'Пост {number}')
+            for number in range(5)
+        )
+        call_command('render_posts', batch_size=2, stdout=StringIO())
+        self.assertEqual(
+            set(Post.objects.values_list('excerpt', flat=True)),
+            {f'Пост {number}' for number in range(5)},
+        )
@@ -0,0 +1,85 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Group, Post, User
+
+POST_TABLE = Post._meta.db_table
+
+
+class FeedQueryPlanTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='random_name')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_group',
+            description='Тестовое описание группы',
+        )
+        Post.objects.bulk_create(
+            Post(text=f'Тестовый пост {number}',
+                 author=cls.user,
+                 group=cls.group if number % 2 else None)
+            for number in range(30)
+        )
+        cls.post = Post.objects.first()
+
+    def setUp(self):
+        cache.clear()
+
+    def get_post_queries(self, url, data=None):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url, data)
+        return [
+            query['sql'] for query in queries.captured_queries
+            if query['sql'].startswith('SELECT') and POST_TABLE in query['sql']
+        ]
+
+    def explain(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            return [row[-1] for row in cursor.fetchall()]
+
+    def assertIndexedPlan(self, sql):
+        for detail in self.explain(sql):
+            self.assertNotIn('TEMP B-TREE', detail, sql)
+            if detail.startswith(f'SCAN {POST_TABLE}'):
+                self.assertIn('INDEX', detail, sql)
+
+    def test_feed_queries_use_indexes(self):
+        """Запросы лент не сканируют таблицу и не сортируют во временном
+        B-дереве."""
+        after = f'20000101000000000000-{self.post.pk}'
+        pages = (
+            ('posts:main_page', None),
+            ('posts:group_list', (self.group.slug,)),
+            ('posts:profile', (self.user.username,)),
+        )
+        for name, args in pages:
+            for data in (None, {'after': after}, {'before': after},
+                         {'page': 2}):
+                with self.subTest(name=name, data=data):
+                    queries = self.get_post_queries(
+                        reverse(name, args=args), data)
+                    self.assertTrue(queries)
+                    for sql in queries:
+                        self.assertIndexedPlan(sql)
+
+    def test_post_detail_query_uses_primary_key(self):
+        """Страница поста ищет запись по первичному ключу."""
+        queries = self.get_post_queries(
+            reverse('posts:post_detail', args=(self.post.pk,)))
+        self.assertTrue(queries)
+        for sql in queries:
+            self.assertIndexedPlan(sql)
+
+    def test_feed_queries_do_not_load_text(self):
+        """Ленты берут готовый анонс и не читают полный текст поста."""
+        column = f'"{POST_TABLE}"."text"'
+        queries = self.get_post_queries(reverse('posts:main_page'))
+        self.assertTrue(queries)
+        for sql in queries:
+            self.assertNotIn(column, sql)
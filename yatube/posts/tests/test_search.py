@@ -0,0 +1,76 @@
+from http import HTTPStatus
+
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Post, User
+from ..search import SearchResults
+
+
+class PostSearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass')
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text='Рецепт борща со сметаной',
+        )
+        cls.other_post = Post.objects.create(
+            author=cls.user,
+            text='Заметки о путешествии',
+        )
+
+    def setUp(self):
+        self.admin_client = Client()
+        self.admin_client.force_login(self.user)
+
+    def search(self, query):
+        response = self.client.get(reverse('posts:search'), {'q': query})
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        return [post.pk for post in response.context['page_obj']]
+
+    def test_search_finds_posts_by_words(self):
+        """Поиск находит посты по словам и их началу."""
+        self.assertEqual(self.search('борщ'), [self.post.pk])
+        self.assertEqual(self.search('РЕЦЕПТ сметан'), [self.post.pk])
+        self.assertEqual(self.search('борщ путешествии'), [])
+
+    def test_search_ignores_query_syntax(self):
+        """Служебные символы FTS5 в запросе не ломают поиск."""
+        for query in ('"', 'борщ AND (', '*', ''):
+            with self.subTest(query=query):
+                self.search(query)
+
+    def test_results_slicing(self):
+        """Результаты поддерживают открытые срезы и, как queryset,
+        не поддерживают отрицательные индексы."""
+        results = SearchResults('борщ')
+        self.assertEqual([post.pk for post in results[0:]], [self.post.pk])
+        self.assertEqual(results[1:], [])
+        self.assertEqual(results[0].pk, self.post.pk)
+        with self.assertRaises(IndexError):
+            results[1]
+        for index in (-1, slice(-1, None), slice(None, -1)):
+            with self.subTest(index=index):
+                with self.assertRaises(AssertionError):
+                    results[index]
+
+    def test_search_index_follows_changes(self):
+        """Индекс обновляется при правке и удалении поста."""
+        self.post.text = 'Рецепт окрошки'
+        self.post.save()
+        self.assertEqual(self.search('борщ'), [])
+        self.assertEqual(self.search('окрошки'), [self.post.pk])
+        self.post.delete()
+        self.assertEqual(self.search('окрошки'), [])
+
+    def test_admin_search_uses_index(self):
+        """Поиск в админке выполняется по полнотекстовому индексу."""
+        response = self.admin_client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'борщ'})
+        self.assertEqual(
+            [post.pk for post in response.context['cl'].result_list],
+            [self.post.pk]
+        )
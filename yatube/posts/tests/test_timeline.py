@@ -0,0 +1,210 @@
+from http import HTTPStatus
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import DatabaseError, connection
+from django.test import (
+    Client, TestCase, TransactionTestCase, override_settings
+)
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from jobs.models import Job
+from jobs.queue import Worker
+
+from ..models import AuthorStats, Follow, Group, Post, TimelineEntry, User
+from ..timeline import fan_out
+from ..utils import QUANTITY_OF_POSTS
+
+
+class TimelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='author')
+        cls.other_author = User.objects.create_user(username='other_author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_group',
+            description='Тестовое описание группы',
+        )
+        cls.author_posts = [
+            Post.objects.create(author=cls.author,
+                                text=f'Пост автора {number}')
+            for number in range(3)
+        ]
+        cls.group_post = Post.objects.create(
+            author=cls.other_author, group=cls.group, text='Пост в группе')
+        cls.other_post = Post.objects.create(
+            author=cls.other_author, text='Пост без подписки')
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def follow(self, name, *args):
+        response = self.reader_client.post(reverse(name, args=args))
+        Worker().run_pending()
+        return response
+
+    def timeline_pks(self):
+        return set(TimelineEntry.objects.filter(
+            user=self.reader).values_list('post_id', flat=True))
+
+    def feed_pks(self, **params):
+        response = self.reader_client.get(reverse('posts:follow_index'),
+                                          params)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        return response.context['page_obj']
+
+    def test_follow_adds_recent_posts(self):
+        """Подписка добавляет в ленту посты автора и группы, отписка
+        убирает их."""
+        self.follow('posts:profile_follow', self.author.username)
+        self.follow('posts:group_follow', self.group.slug)
+        expected = {post.pk for post in self.author_posts}
+        self.assertEqual(self.timeline_pks(),
+                         expected | {self.group_post.pk})
+        self.assertEqual([post.pk for post in self.feed_pks()],
+                         sorted(expected | {self.group_post.pk},
+                                reverse=True))
+        self.follow('posts:group_unfollow', self.group.slug)
+        self.assertEqual(self.timeline_pks(), expected)
+        self.assertEqual(
+            AuthorStats.objects.get(author=self.author).followers_count, 1)
+
+    def test_unfollow_keeps_posts_from_other_follows(self):
+        """Пост остаётся в ленте, пока читатель подписан на его автора
+        или группу."""
+        self.follow('posts:profile_follow', self.other_author.username)
+        self.follow('posts:group_follow', self.group.slug)
+        self.follow('posts:profile_unfollow', self.other_author.username)
+        self.assertEqual(self.timeline_pks(), {self.group_post.pk})
+
+    def test_follow_backfill_runs_in_worker(self):
+        """Недавние посты попадают в ленту задачей из очереди, отписка
+        до её выполнения отменяет заполнение."""
+        url = reverse('posts:profile_follow', args=(self.author.username,))
+        self.reader_client.post(url)
+        self.assertEqual(self.timeline_pks(), set())
+        Worker().run_pending()
+        self.assertEqual(self.timeline_pks(),
+                         {post.pk for post in self.author_posts})
+        self.follow('posts:profile_unfollow', self.author.username)
+        self.reader_client.post(url)
+        self.reader_client.post(reverse('posts:profile_unfollow',
+                                        args=(self.author.username,)))
+        Worker().run_pending()
+        self.assertEqual(self.timeline_pks(), set())
+
+    def test_cannot_follow_self(self):
+        """Подписаться на себя нельзя, GET не меняет подписки."""
+        self.follow('posts:profile_follow', self.reader.username)
+        response = self.reader_client.get(
+            reverse('posts:profile_follow', args=(self.author.username,)))
+        self.assertEqual(response.status_code, HTTPStatus.METHOD_NOT_ALLOWED)
+        self.assertFalse(Follow.objects.exists())
+
+    def test_profile_shows_follow_state(self):
+        """Страница автора показывает, подписан ли читатель."""
+        url = reverse('posts:profile', args=(self.author.username,))
+        self.assertFalse(self.reader_client.get(url).context['following'])
+        self.follow('posts:profile_follow', self.author.username)
+        self.assertTrue(self.reader_client.get(url).context['following'])
+
+    def test_fan_out_new_and_moved_posts(self):
+        """Новый пост попадает в ленты подписчиков, пост, перенесённый
+        из группы, из них уходит."""
+        self.follow('posts:group_follow', self.group.slug)
+        post = Post.objects.create(author=self.author, group=self.group,
+                                   text='Новый пост')
+        fan_out(post.pk)
+        self.assertIn(post.pk, self.timeline_pks())
+        post.group = None
+        post.save()
+        fan_out(post.pk)
+        self.assertNotIn(post.pk, self.timeline_pks())
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=2)
+    def test_popular_sources_are_read_on_request(self):
+        """Посты популярных источников не раскладываются по лентам,
+        а подмешиваются при чтении, страницы идут без пропусков."""
+        Follow.objects.create(user=self.other_author, author=self.author)
+        self.follow('posts:profile_follow', self.author.username)
+        self.follow('posts:group_follow', self.group.slug)
+        Post.objects.bulk_create(
+            Post(author=self.author, text=f'Ещё пост {number}')
+            for number in range(QUANTITY_OF_POSTS)
+        )
+        post = Post.objects.create(author=self.author, text='Новый пост')
+        fan_out(post.pk)
+        self.assertEqual(self.timeline_pks(), {self.group_post.pk})
+        expected = list(Post.objects.filter(
+            author=self.author).values_list('pk', flat=True))
+        expected.insert(
+            sum(pk > self.group_post.pk for pk in expected),
+            self.group_post.pk)
+        first = self.feed_pks()
+        second = self.feed_pks(after=first.next_cursor)
+        self.assertEqual([post.pk for post in first]
+                         + [post.pk for post in second], expected)
+        self.assertEqual(
+            list(self.feed_pks(before=second.previous_cursor)), list(first))
+
+    def test_feed_reads_one_index_range(self):
+        """Страница ленты читается по индексу без сортировки."""
+        self.follow('posts:profile_follow', self.author.username)
+        table = TimelineEntry._meta.db_table
+        with CaptureQueriesContext(connection) as queries:
+            self.feed_pks()
+        selects = [query['sql'] for query in queries.captured_queries
+                   if query['sql'].startswith('SELECT')
+                   and f'FROM "{table}"' in query['sql']]
+        self.assertEqual(len(selects), 1)
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {selects[0]}')
+            plan = ' '.join(row[-1] for row in cursor.fetchall())
+        self.assertIn('timeline_user_pub_date_idx', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_saved_posts_are_fanned_out_by_worker(self):
+        """Создание и перенос поста ставят одну задачу раскладки,
+        исполнитель раскладывает пост по лентам."""
+        self.follow('posts:group_follow', self.group.slug)
+        author_client = Client()
+        author_client.force_login(self.author)
+        author_client.post(reverse('posts:post_create'),
+                           {'text': 'Новый пост'})
+        post = Post.objects.latest('pk')
+        author_client.post(reverse('posts:post_edit', args=(post.pk,)),
+                           {'text': 'Новый пост', 'group': self.group.pk})
+        self.assertEqual(Job.objects.filter(
+            key=f'fan-out:{post.pk}').count(), 1)
+        self.assertNotIn(post.pk, self.timeline_pks())
+        Worker().run_pending()
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.reader, post=post, pub_date=post.pub_date).exists())
+        self.assertFalse(Job.objects.exists())
+
+
+class TimelineJobTransactionTests(TransactionTestCase):
+
+    def test_write_is_not_kept_without_its_job(self):
+        """Если задачу не удалось поставить, пост и подписка
+        не сохраняются и счётчик подписчиков не меняется."""
+        reader = User.objects.create_user(username='reader')
+        author = User.objects.create_user(username='author')
+        with mock.patch('posts.signals.fan_out_posts.enqueue',
+                        side_effect=DatabaseError):
+            with self.assertRaises(DatabaseError):
+                Post.objects.create(author=author, text='Новый пост')
+        with mock.patch('posts.timeline.backfill_follower.enqueue',
+                        side_effect=DatabaseError):
+            with self.assertRaises(DatabaseError):
+                Follow.objects.create(user=reader, author=author)
+        self.assertFalse(Post.objects.exists())
+        self.assertFalse(Follow.objects.exists())
+        self.assertFalse(AuthorStats.objects.filter(
+            author=author, followers_count__gt=0).exists())
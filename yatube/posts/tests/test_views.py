@@ -1,10 +1,14 @@
 from django import forms
 from django.conf import settings
+from django.db import connection
 from django.test import Client, TestCase
+from django.template.loader import render_to_string
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
-from ..models import Group, Post, User
+from ..models import Group, Post, SiteStats, User
 from posts.forms import PostForm
+from posts.utils import ElidedPaginator
 
 NUM_POSTS_PAG_TEST = settings.NUM_POSTS_PAG_TEST
 QUANTITY_OF_POSTS = settings.QUANTITY_OF_POSTS
@@ -81,6 +85,16 @@ class PostViewsTests(TestCase):
         )
         self.sample_context_test_func(response.context, post=True)
 
+    def test_post_detail_renders_in_one_query(self):
+        """Страница поста строится одним запросом к базе."""
+        url = reverse('posts:post_detail', args=(self.post.pk,))
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        self.assertEqual(response.context['posts_count'], 1)
+        # Сессия и пользователь добавляют ещё два запроса.
+        with self.assertNumQueries(3):
+            self.authorized_client.get(url)
+
     def test_create_edit_post_shows_correct_context(self):
         """Шаблоны post_create и eidt_post сформированы
             с правильным контекстом"""
@@ -169,3 +183,106 @@ class PaginatorViewsTest(TestCase):
                             count,
                             'Ошибка:неверное количество постов.'
                         )
+
+
+class KeysetPaginatorViewsTest(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='random_name')
+        self.group = Group.objects.create(title='Тестовая группа',
+                                          slug='test_group')
+        Post.objects.bulk_create(
+            Post(text=f'Тестовый пост {post}',
+                 group=self.group,
+                 author=self.user)
+            for post in range(NUM_POSTS_PAG_TEST)
+        )
+
+    def test_keyset_pages_follow_cursor(self):
+        '''Курсорная пагинация отдаёт все посты без повторов'''
+        page_urls = (
+            ('posts:main_page', None),
+            ('posts:profile', (self.user.username,)),
+            ('posts:group_list', (self.group.slug,)),
+        )
+        expected = list(
+            Post.objects.order_by('-pub_date', '-pk')
+            .values_list('pk', flat=True)
+        )
+        for url, args in page_urls:
+            with self.subTest(url=url):
+                response = self.client.get(reverse(url, args=args))
+                first_page = response.context['page_obj']
+                self.assertEqual(len(first_page), QUANTITY_OF_POSTS)
+                self.assertFalse(first_page.has_previous())
+                self.assertTrue(first_page.has_next())
+                response = self.client.get(
+                    reverse(url, args=args),
+                    {'after': first_page.next_cursor}
+                )
+                second_page = response.context['page_obj']
+                self.assertFalse(second_page.has_next())
+                self.assertEqual(
+                    [post.pk for post in first_page]
+                    + [post.pk for post in second_page],
+                    expected
+                )
+                response = self.client.get(
+                    reverse(url, args=args),
+                    {'before': second_page.previous_cursor}
+                )
+                self.assertEqual(
+                    [post.pk for post in response.context['page_obj']],
+                    [post.pk for post in first_page]
+                )
+
+    def test_keyset_page_does_not_count(self):
+        '''Курсорная страница не выполняет COUNT(*) и OFFSET'''
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('posts:main_page'), {'after': 'bad'})
+        for query in queries.captured_queries:
+            self.assertNotIn('COUNT(', query['sql'])
+            self.assertNotIn('OFFSET', query['sql'])
+
+
+class StoredCountPaginatorTest(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='random_name')
+        SiteStats.objects.update_or_create(pk=1)
+        Post.objects.bulk_create(
+            Post(text=f'Тестовый пост {post}', author=self.user)
+            for post in range(NUM_POSTS_PAG_TEST)
+        )
+
+    def test_index_pages_read_stored_count(self):
+        '''Старые ссылки ?page=N на главной берут число постов
+        из счётчика, который ведут триггеры, а не COUNT(*)'''
+        Post.objects.create(author=self.user, text='Ещё пост')
+        Post.objects.filter(pk=Post.objects.earliest('pk').pk).delete()
+        url = reverse('posts:main_page')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, {'page': 2})
+        for query in queries.captured_queries:
+            self.assertNotIn('COUNT(', query['sql'])
+        self.assertEqual(response.context['page_obj'].paginator.count,
+                         NUM_POSTS_PAG_TEST)
+
+
+class ElidedPaginatorTest(TestCase):
+
+    def render_paginator(self, count, page_number):
+        paginator = ElidedPaginator([], QUANTITY_OF_POSTS, count)
+        return render_to_string('posts/includes/paginator.html', {
+            'page_obj': paginator.page(page_number),
+        })
+
+    def test_navigation_size_does_not_grow(self):
+        '''Навигация по страницам не растёт вместе с числом постов'''
+        small = self.render_paginator(1000, 50)
+        large = self.render_paginator(200000, 10000)
+        self.assertEqual(large.count('<li'), small.count('<li'))
+        self.assertLess(len(large), len(small) * 1.2)
+        self.assertIn('?page=10003', large)
+        self.assertNotIn('?page=10004', large)
+        self.assertIn('?page=20000', large)
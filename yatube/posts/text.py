@@ -0,0 +1,32 @@
+from django.utils.html import linebreaks
+from django.utils.text import Truncator
+
+EXCERPT_WORDS = 15
+
+
+def make_excerpt(text):
+    return Truncator(text).words(EXCERPT_WORDS, truncate=' …')
+
+
+def render_text_html(text):
+    return linebreaks(text, autoescape=True)
+
+
+def render_posts(posts, batch_size=1000):
+    """Заполняет excerpt и text_html у постов пачками по первичному
+    ключу. Принимает queryset, в том числе исторической модели
+    из миграции."""
+    manager = posts.model._base_manager
+    posts = posts.only('pk', 'text').order_by('pk')
+    last_pk = 0
+    rendered = 0
+    while True:
+        batch = list(posts.filter(pk__gt=last_pk)[:batch_size])
+        if not batch:
+            return rendered
+        for post in batch:
+            post.excerpt = make_excerpt(post.text)
+            post.text_html = render_text_html(post.text)
+        manager.bulk_update(batch, ('excerpt', 'text_html'))
+        last_pk = batch[-1].pk
+        rendered += len(batch)
@@ -0,0 +1,181 @@
+"""Лента подписок.
+
+Новый пост автора или группы раскладывается по лентам их подписчиков
+(TimelineEntry), а недавние посты — в ленту нового подписчика фоновыми
+задачами из очереди jobs. Страница ленты читается одним диапазоном
+индекса (user, pub_date, post). Авторов
+и группы, у которых не меньше TIMELINE_FANOUT_LIMIT подписчиков,
+раскладывать слишком дорого: их посты подмешиваются при чтении
+из индексов постов по автору и группе.
+"""
+from functools import reduce
+from itertools import islice
+from operator import or_
+
+from django.conf import settings
+from django.db.models import F, Q
+
+from jobs.queue import task
+
+from .models import AuthorStats, Follow, Group, Post, TimelineEntry
+from .utils import KeysetPaginator, order_by_key
+
+
+def get_source_posts(author_id, group_id):
+    if author_id is not None:
+        return Post.objects.filter(author_id=author_id)
+    return Post.objects.filter(group_id=group_id)
+
+
+def change_followers_count(follow, delta):
+    if follow.author_id is None:
+        counter = Group.objects.filter(pk=follow.group_id)
+    else:
+        if delta > 0:
+            AuthorStats.objects.get_or_create(author_id=follow.author_id)
+        counter = AuthorStats.objects.filter(author_id=follow.author_id)
+    counter.update(followers_count=F('followers_count') + delta)
+    return counter.values_list('followers_count', flat=True).first() or 0
+
+
+def insert_entries(entries):
+    entries = iter(entries)
+    batch = list(islice(entries, settings.TIMELINE_BATCH_SIZE))
+    while batch:
+        TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+        batch = list(islice(entries, settings.TIMELINE_BATCH_SIZE))
+
+
+def backfill(author_id, group_id, user_ids):
+    """Добавляет в ленты user_ids последние TIMELINE_BACKFILL постов
+    автора или группы."""
+    posts = list(get_source_posts(author_id, group_id).order_by(
+        '-pub_date', '-pk').values_list('pk', 'pub_date')[
+            :settings.TIMELINE_BACKFILL])
+    insert_entries(
+        TimelineEntry(user_id=user_id, post_id=post_id, pub_date=pub_date)
+        for user_id in user_ids
+        for post_id, pub_date in posts
+    )
+
+
+@task()
+def backfill_followers(author_id, group_id):
+    """Источник стал раскладываться при записи: его недавние посты
+    нужно добавить в ленты всех подписчиков."""
+    followers = Follow.objects.filter(author_id=author_id,
+                                      group_id=group_id)
+    backfill(author_id, group_id,
+             followers.values_list('user_id', flat=True).iterator())
+
+
+@task()
+def backfill_follower(user_id, author_id, group_id):
+    """Добавляет в ленту нового подписчика недавние посты источника,
+    если он не успел отписаться, пока задача ждала в очереди."""
+    if Follow.objects.filter(user_id=user_id, author_id=author_id,
+                             group_id=group_id).exists():
+        backfill(author_id, group_id, [user_id])
+
+
+def follow_added(follow):
+    if change_followers_count(follow, 1) < settings.TIMELINE_FANOUT_LIMIT:
+        backfill_follower.enqueue(follow.user_id, follow.author_id,
+                                  follow.group_id)
+
+
+def follow_removed(follow):
+    """Убирает из ленты посты источника, кроме тех, что попадают в неё
+    через другую подписку."""
+    entries = TimelineEntry.objects.filter(user_id=follow.user_id)
+    if follow.author_id is not None:
+        entries = entries.filter(post__author_id=follow.author_id).exclude(
+            post__group__followers__user_id=follow.user_id)
+    else:
+        entries = entries.filter(post__group_id=follow.group_id).exclude(
+            post__author__following__user_id=follow.user_id)
+    entries.delete()
+    count = change_followers_count(follow, -1)
+    if count == settings.TIMELINE_FANOUT_LIMIT - 1:
+        backfill_followers.enqueue(follow.author_id, follow.group_id)
+
+
+def get_fanout_sources(author_id, group_id):
+    """Условие на подписки, через которые пост раскладывается
+    по лентам, или None, если все его источники читаются при чтении."""
+    limit = settings.TIMELINE_FANOUT_LIMIT
+    sources = []
+    if not AuthorStats.objects.filter(
+            author_id=author_id, followers_count__gte=limit).exists():
+        sources.append(Q(author_id=author_id))
+    if group_id is not None and not Group.objects.filter(
+            pk=group_id, followers_count__gte=limit).exists():
+        sources.append(Q(group_id=group_id))
+    return reduce(or_, sources) if sources else None
+
+
+def fan_out(post_id):
+    """Раскладывает пост по лентам подписчиков и убирает его из лент,
+    в которые он больше не должен попадать после правки."""
+    post = Post.objects.filter(pk=post_id).values(
+        'author_id', 'group_id', 'pub_date').first()
+    if post is None:
+        return
+    sources = get_fanout_sources(post['author_id'], post['group_id'])
+    follows = (Follow.objects.none() if sources is None
+               else Follow.objects.filter(sources))
+    followers = follows.values_list('user_id', flat=True).distinct()
+    TimelineEntry.objects.filter(post_id=post_id).exclude(
+        user_id__in=followers).delete()
+    insert_entries(
+        TimelineEntry(user_id=user_id, post_id=post_id,
+                      pub_date=post['pub_date'])
+        for user_id in followers.iterator()
+    )
+
+
+@task(batch=True)
+def fan_out_posts(payloads):
+    """Раскладывает пачку новых и перенесённых постов."""
+    for post_id, in payloads:
+        fan_out(post_id)
+
+
+def get_pulled_posts(user):
+    """Посты популярных авторов и групп из подписок пользователя,
+    которые не раскладываются по лентам: по запросу на источник,
+    каждый читает свой индекс постов."""
+    limit = settings.TIMELINE_FANOUT_LIMIT
+    sources = Follow.objects.filter(user=user).filter(
+        Q(author__stats__followers_count__gte=limit)
+        | Q(group__followers_count__gte=limit)
+    ).values_list('author_id', 'group_id')
+    posts = Post.objects.select_related('author', 'group').defer('text')
+    return [
+        posts.filter(author_id=author_id) if author_id is not None
+        else posts.filter(group_id=group_id)
+        for author_id, group_id in sources
+    ]
+
+
+class TimelinePaginator(KeysetPaginator):
+    """Постраничная лента подписок: диапазон разложенных записей
+    пользователя, слитый с постами популярных источников."""
+
+    def __init__(self, user, per_page, **kwargs):
+        entries = TimelineEntry.objects.filter(user=user).select_related(
+            'post__author', 'post__group').defer('post__text')
+        super().__init__(entries.order_by('-pub_date', '-post_id'),
+                         per_page, **kwargs)
+        self.pulled = get_pulled_posts(user)
+
+    def fetch(self, key=None, descending=True):
+        limit = self.per_page + 1
+        entries = order_by_key(self.object_list, key, descending, 'post_id')
+        posts = {entry.post.pk: entry.post for entry in entries[:limit]}
+        for source in self.pulled:
+            for post in order_by_key(source, key, descending)[:limit]:
+                posts.setdefault(post.pk, post)
+        return sorted(posts.values(), key=lambda post: (post.pub_date,
+                                                        post.pk),
+                      reverse=descending)[:limit]
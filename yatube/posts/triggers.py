@@ -0,0 +1,136 @@
+"""Триггеры и полнотекстовый индекс SQLite для таблицы постов.
+
+SQLite удаляет триггеры, когда миграция пересоздаёт таблицу, поэтому
+они устанавливаются заново после каждого migrate.
+"""
+import re
+
+from django.db import connections
+from django.db.migrations.executor import MigrationExecutor
+
+POST_TRIGGERS = (
+    """
+    CREATE TRIGGER IF NOT EXISTS posts_post_count_insert
+    AFTER INSERT ON posts_post
+    BEGIN
+        INSERT OR IGNORE INTO posts_authorstats
+            (author_id, posts_count, followers_count)
+        VALUES (NEW.author_id, 0, 0);
+        UPDATE posts_authorstats SET posts_count = posts_count + 1
+        WHERE author_id = NEW.author_id;
+        UPDATE posts_group SET posts_count = posts_count + 1
+        WHERE id = NEW.group_id;
+        UPDATE posts_sitestats SET posts_count = posts_count + 1
+        WHERE id = 1;
+    END;
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS posts_post_count_delete
+    AFTER DELETE ON posts_post
+    BEGIN
+        UPDATE posts_authorstats SET posts_count = posts_count - 1
+        WHERE author_id = OLD.author_id AND posts_count > 0;
+        UPDATE posts_group SET posts_count = posts_count - 1
+        WHERE id = OLD.group_id AND posts_count > 0;
+        UPDATE posts_sitestats SET posts_count = posts_count - 1
+        WHERE id = 1 AND posts_count > 0;
+    END;
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS posts_post_count_update
+    AFTER UPDATE OF author_id, group_id ON posts_post
+    WHEN OLD.author_id IS NOT NEW.author_id
+        OR OLD.group_id IS NOT NEW.group_id
+    BEGIN
+        UPDATE posts_authorstats SET posts_count = posts_count - 1
+        WHERE author_id = OLD.author_id AND posts_count > 0;
+        INSERT OR IGNORE INTO posts_authorstats
+            (author_id, posts_count, followers_count)
+        VALUES (NEW.author_id, 0, 0);
+        UPDATE posts_authorstats SET posts_count = posts_count + 1
+        WHERE author_id = NEW.author_id;
+        UPDATE posts_group SET posts_count = posts_count - 1
+        WHERE id = OLD.group_id AND posts_count > 0;
+        UPDATE posts_group SET posts_count = posts_count + 1
+        WHERE id = NEW.group_id;
+    END;
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS posts_post_fts_insert
+    AFTER INSERT ON posts_post
+    BEGIN
+        INSERT INTO posts_post_fts (rowid, text) VALUES (NEW.id, NEW.text);
+    END;
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS posts_post_fts_delete
+    AFTER DELETE ON posts_post
+    BEGIN
+        INSERT INTO posts_post_fts (posts_post_fts, rowid, text)
+        VALUES ('delete', OLD.id, OLD.text);
+    END;
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS posts_post_fts_update
+    AFTER UPDATE OF text ON posts_post
+    BEGIN
+        INSERT INTO posts_post_fts (posts_post_fts, rowid, text)
+        VALUES ('delete', OLD.id, OLD.text);
+        INSERT INTO posts_post_fts (rowid, text) VALUES (NEW.id, NEW.text);
+    END;
+    """,
+)
+
+SEARCH_TABLE = 'posts_post_fts'
+TRIGGER_NAME = re.compile(r'IF NOT EXISTS (\w+)')
+
+
+def rebuild_search_index(connection):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}) VALUES ('rebuild')")
+
+
+def install_search_index(connection):
+    if SEARCH_TABLE in connection.introspection.table_names():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE {SEARCH_TABLE} USING fts5("
+            "text, content='posts_post', content_rowid='id', "
+            "tokenize='unicode61 remove_diacritics 2')"
+        )
+    rebuild_search_index(connection)
+
+
+def install_triggers(using='default', **kwargs):
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return
+    install_search_index(connection)
+    with connection.cursor() as cursor:
+        for sql in POST_TRIGGERS:
+            cursor.execute(sql)
+
+
+def install_after_migrate(using='default', **kwargs):
+    """Обработчик post_migrate. Пока миграции постов применены
+    не до конца, триггеры ссылались бы на таблицы и столбцы, которых
+    ещё нет, и ломали бы следующие миграции: их поставит migrate,
+    который применит последнюю."""
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return
+    executor = MigrationExecutor(connection)
+    if executor.migration_plan(executor.loader.graph.leaf_nodes('posts')):
+        return
+    install_triggers(using)
+
+
+def drop_triggers(connection):
+    """Снимает триггеры на время массовой загрузки. После неё нужно
+    вызвать install_triggers и пересчитать счётчики и индекс."""
+    with connection.cursor() as cursor:
+        for sql in POST_TRIGGERS:
+            name = TRIGGER_NAME.search(sql).group(1)
+            cursor.execute(f'DROP TRIGGER IF EXISTS {name}')
@@ -1,10 +1,172 @@
-from django.core.paginator import Paginator
+from datetime import datetime
+
+from django.core.paginator import Page, Paginator
 from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Post
 
 QUANTITY_OF_POSTS = settings.QUANTITY_OF_POSTS
+CURSOR_DATE_FORMAT = '%Y%m%d%H%M%S%f'
+ELLIPSIS = '…'
+
+
+def encode_cursor(post):
+    pub_date = timezone.localtime(post.pub_date, timezone.utc)
+    return f'{pub_date.strftime(CURSOR_DATE_FORMAT)}-{post.pk}'
+
+
+def decode_cursor(cursor):
+    try:
+        pub_date, pk = cursor.split('-')
+        pub_date = datetime.strptime(pub_date, CURSOR_DATE_FORMAT)
+        return pub_date.replace(tzinfo=timezone.utc), int(pk)
+    except (AttributeError, ValueError):
+        return None
+
+
+def get_elided_page_range(number, num_pages, on_each_side=3, on_ends=1):
+    """Номера страниц для навигации: первые и последние on_ends страниц
+    и по on_each_side страниц вокруг текущей, пропуски заменяются
+    на ELLIPSIS. Длина списка не зависит от числа страниц."""
+    if num_pages <= (on_each_side + on_ends) * 2 + 1:
+        return list(range(1, num_pages + 1))
+    pages = []
+    if number > on_each_side + on_ends + 1:
+        pages.extend(range(1, on_ends + 1))
+        pages.append(ELLIPSIS)
+        pages.extend(range(number - on_each_side, number + 1))
+    else:
+        pages.extend(range(1, number + 1))
+    if number < num_pages - on_each_side - on_ends:
+        pages.extend(range(number + 1, number + on_each_side + 1))
+        pages.append(ELLIPSIS)
+        pages.extend(range(num_pages - on_ends + 1, num_pages + 1))
+    else:
+        pages.extend(range(number + 1, num_pages + 1))
+    return pages
+
+
+class ElidedPage(Page):
+
+    @property
+    def elided_page_range(self):
+        return get_elided_page_range(self.number, self.paginator.num_pages)
+
+
+class ElidedPaginator(Paginator):
+    """Постраничный пагинатор с сокращённой навигацией. Может принять
+    заранее известное число объектов вместо COUNT(*)."""
+
+    ELLIPSIS = ELLIPSIS
+
+    def __init__(self, object_list, per_page, count=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        if count is not None:
+            self.count = count
+
+    def _get_page(self, *args, **kwargs):
+        return ElidedPage(*args, **kwargs)
+
+
+def order_by_key(queryset, key, descending=True, pk='pk'):
+    """Упорядочивает queryset по (pub_date, pk) и оставляет записи
+    после ключа key = (pub_date, pk) в выбранном направлении."""
+    direction, compare = ('-', 'lt') if descending else ('', 'gt')
+    queryset = queryset.order_by(f'{direction}pub_date', f'{direction}{pk}')
+    if key is None:
+        return queryset
+    pub_date, pk_value = key
+    return queryset.filter(
+        Q(**{f'pub_date__{compare}': pub_date})
+        | Q(pub_date=pub_date, **{f'{pk}__{compare}': pk_value})
+    )
+
+
+class KeysetPage(Page):
+    """Страница ленты, построенная по курсору (pub_date, id)."""
+
+    def __init__(self, object_list, paginator, next_cursor=None,
+                 previous_cursor=None):
+        super().__init__(object_list, None, paginator)
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return '<Keyset page>'
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+
+class KeysetPaginator(Paginator):
+    """Пагинатор без OFFSET и COUNT(*): страница выбирается
+    по индексу (pub_date, id), поэтому её стоимость не зависит
+    от глубины."""
+
+    is_keyset = True
+
+    def get_page(self, after=None, before=None):
+        key = decode_cursor(before)
+        if key is not None:
+            return self._page_before(before, *key)
+        key = decode_cursor(after)
+        if key is not None:
+            return self._page_after(after, *key)
+        return self._page_after()
+
+    def fetch(self, key=None, descending=True):
+        """До per_page + 1 постов: после key в порядке ленты или,
+        при descending=False, перед ним в обратном порядке."""
+        posts = order_by_key(self.object_list, key, descending)
+        return list(posts[:self.per_page + 1])
+
+    def _page_after(self, cursor=None, pub_date=None, pk=None):
+        key = None if cursor is None else (pub_date, pk)
+        posts = self.fetch(key)
+        page = KeysetPage(posts[:self.per_page], self)
+        if len(posts) > self.per_page:
+            page.next_cursor = encode_cursor(page[-1])
+        if cursor is not None:
+            page.previous_cursor = encode_cursor(page[0]) if page else cursor
+        return page
+
+    def _page_before(self, cursor, pub_date, pk):
+        posts = self.fetch((pub_date, pk), descending=False)
+        page = KeysetPage(posts[:self.per_page][::-1], self)
+        page.next_cursor = encode_cursor(page[-1]) if page else cursor
+        if len(posts) > self.per_page:
+            page.previous_cursor = encode_cursor(page[0])
+        return page
+
+
+def get_index_posts():
+    return Post.objects.select_related('author', 'group').defer('text')
+
+
+def get_group_posts(group):
+    return group.posts.select_related('author').defer('text')
+
+
+def get_author_posts(author):
+    return author.posts.select_related('group').defer('text')
 
 
-def get_page_context(request, posts):
-    paginator = Paginator(posts, QUANTITY_OF_POSTS)
+def get_page_context(request, posts, count=None):
+    """Страница ленты. count — сохранённое число постов или функция,
+    которая его вернёт: нужно только для старых ссылок ?page=N."""
     page_number = request.GET.get('page')
-    return paginator.get_page(page_number)
+    if page_number is not None:
+        if callable(count):
+            count = count()
+        paginator = ElidedPaginator(posts, QUANTITY_OF_POSTS, count)
+        return paginator.get_page(page_number)
+    paginator = KeysetPaginator(posts, QUANTITY_OF_POSTS)
+    return paginator.get_page(
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+    )
@@ -1,49 +1,159 @@
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
+from django.http import HttpResponseBadRequest, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
+from django.utils.http import quote_etag, urlencode
+from django.views.decorators.http import condition, require_POST
 
+from core.replicas import replica_reads
+
+from .cache import (
+    cache_feed_page, feed_etag, group_feed, index_feed, post_etag,
+    profile_feed, remember_post_validator
+)
+from .export import WRITERS, export_rows, filter_posts
 from .forms import PostForm
-from .models import Group, Post, User
-from .utils import get_page_context
+from .lookups import (
+    author_lookup, get_author, get_existing, get_group, group_lookup
+)
+from .models import AuthorStats, Follow, Group, Post, SiteStats, User
+from .search import SearchResults
+from .timeline import TimelinePaginator
+from .utils import (
+    QUANTITY_OF_POSTS, ElidedPaginator, get_author_posts, get_group_posts,
+    get_index_posts, get_page_context
+)
 
 
+@replica_reads
+@condition(etag_func=feed_etag(index_feed))
+@cache_feed_page(index_feed)
 def index(request):
-    posts = Post.objects.select_related('author', 'group').all()
-    page_obj = get_page_context(request, posts)
+    posts = get_index_posts()
+    page_obj = get_page_context(request, posts, SiteStats.get_posts_count)
     context = {
         'page_obj': page_obj,
     }
     return render(request, 'posts/index.html', context)
 
 
+@replica_reads
+@condition(etag_func=feed_etag(group_feed, get_object=get_group))
+@cache_feed_page(group_feed)
 def group_posts(request, slug):
-    group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.select_related('author').all()
-    page_obj = get_page_context(request, posts)
+    group = group_lookup.get(slug)
+    posts = get_group_posts(group)
+    page_obj = get_page_context(request, posts, group.posts_count)
+    following = request.user.is_authenticated and Follow.objects.filter(
+        user=request.user, group=group).exists()
     context = {
         'group': group,
+        'following': following,
         'page_obj': page_obj,
     }
     return render(request, 'posts/group_list.html', context)
 
 
+@replica_reads
+@condition(etag_func=feed_etag(profile_feed, get_object=get_author))
+@cache_feed_page(profile_feed)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    posts = author.posts.select_related('group')
-    page_obj = get_page_context(request, posts)
+    author = author_lookup.get(username)
+    posts = get_author_posts(author)
+    posts_count, following = AuthorStats.get_profile_stats(
+        author, request.user)
+    page_obj = get_page_context(request, posts, posts_count)
     context = {
         'author': author,
+        'posts_count': posts_count,
+        'following': following,
         'page_obj': page_obj,
     }
     return render(request, 'posts/profile.html', context)
 
 
+@replica_reads
+@condition(etag_func=post_etag)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
+    post = get_existing(
+        'post', post_id,
+        Post.objects.select_related('author__stats', 'group'),
+        pk=post_id,
+    )
+    try:
+        posts_count = post.author.stats.posts_count
+    except AuthorStats.DoesNotExist:
+        posts_count = 0
+    remembered = remember_post_validator(post)
     context = {
         'post': post,
         'post_id': post_id,
+        'posts_count': posts_count,
+    }
+    response = render(request, 'posts/post_detail.html', context)
+    if remembered:
+        # При первом запросе валидатора ещё не было, и condition
+        # не смог выставить ETag сам.
+        response['ETag'] = quote_etag(post_etag(request, post_id))
+    return response
+
+
+@replica_reads
+@login_required
+def follow_index(request):
+    paginator = TimelinePaginator(request.user, QUANTITY_OF_POSTS)
+    page_obj = paginator.get_page(
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+    )
+    context = {
+        'page_obj': page_obj,
     }
-    return render(request, 'posts/post_detail.html', context)
+    return render(request, 'posts/follow.html', context)
+
+
+@login_required
+@require_POST
+def profile_follow(request, username):
+    author = get_object_or_404(User, username=username)
+    if author.pk != request.user.pk:
+        Follow.objects.get_or_create(user=request.user, author=author)
+    return redirect('posts:profile', username)
+
+
+@login_required
+@require_POST
+def profile_unfollow(request, username):
+    Follow.objects.filter(user=request.user,
+                          author__username=username).delete()
+    return redirect('posts:profile', username)
+
+
+@login_required
+@require_POST
+def group_follow(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    Follow.objects.get_or_create(user=request.user, group=group)
+    return redirect('posts:group_list', slug)
+
+
+@login_required
+@require_POST
+def group_unfollow(request, slug):
+    Follow.objects.filter(user=request.user, group__slug=slug).delete()
+    return redirect('posts:group_list', slug)
+
+
+def search(request):
+    query = request.GET.get('q', '').strip()
+    paginator = ElidedPaginator(SearchResults(query), QUANTITY_OF_POSTS)
+    page_obj = paginator.get_page(request.GET.get('page'))
+    context = {
+        'query': query,
+        'page_params': urlencode({'q': query}) + '&',
+        'page_obj': page_obj,
+    }
+    return render(request, 'posts/search.html', context)
 
 
 @login_required
@@ -73,3 +183,25 @@ def post_edit(request, post_id):
         'form': form,
     }
     return render(request, 'posts/create_post.html', context)
+
+
+@staff_member_required
+def export_posts(request):
+    file_format = request.GET.get('format', 'jsonl')
+    if file_format not in WRITERS:
+        return HttpResponseBadRequest('Неизвестный формат')
+    try:
+        posts = filter_posts(
+            author=request.GET.get('author'),
+            group=request.GET.get('group'),
+            since=request.GET.get('since'),
+            until=request.GET.get('until'),
+        )
+    except ValueError as error:
+        return HttpResponseBadRequest(str(error))
+    writer, content_type = WRITERS[file_format]
+    response = StreamingHttpResponse(
+        writer(export_rows(posts)), content_type=content_type)
+    response['Content-Disposition'] = (
+        f'attachment; filename="posts.{file_format}"')
+    return response
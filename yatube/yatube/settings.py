@@ -1,4 +1,5 @@
 import os
+import sys
 
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -7,11 +8,16 @@ SECRET_KEY = ')o*eh)-*-g8c%r7f$9+)1b!d%xng4n*rycg+$aro*9041^&3!j'
 
 DEBUG = True
 
+TESTING = sys.argv[1:2] == ['test'] or 'pytest' in sys.modules
+
 LOGIN_URL = 'users:login'
 LOGIN_REDIRECT_URL = 'posts:main_page'
 # LOGOUT_REDIRECT_URL = 'posts:main_page'
 
-EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+# Письма сохраняются в исходящие и отправляются исполнителями фоновых
+# задач через MAIL_TRANSPORT.
+EMAIL_BACKEND = 'mail.backends.QueuedEmailBackend'
+MAIL_TRANSPORT = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
 ALLOWED_HOSTS = [
@@ -26,6 +32,8 @@ INSTALLED_APPS = [
     'core.apps.CoreConfig',
     'users.apps.UsersConfig',
     'about.apps.AboutConfig',
+    'jobs.apps.JobsConfig',
+    'mail.apps.MailConfig',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -35,13 +43,17 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.timing.ServerTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'core.queries.QueryBudgetMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.replicas.ReplicaMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.timing.ViewTimingMiddleware',
 ]
 
 ROOT_URLCONF = 'yatube.urls'
@@ -52,7 +64,7 @@ TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.timing.TimedDjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -74,6 +86,57 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'CONN_MAX_AGE': 60,
+        'OPTIONS': {
+            'timeout': 20,
+        },
+    },
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, 'db_replica.sqlite3'),
+        'CONN_MAX_AGE': 60,
+        'OPTIONS': {
+            'timeout': 20,
+        },
+        'TEST': {
+            'MIRROR': 'default',
+        },
+    },
+}
+
+# Выполняются на каждом новом соединении SQLite. WAL не даёт записи
+# блокировать читателей, при synchronous=NORMAL в этом режиме
+# fsync делается только на контрольных точках.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,
+}
+
+DATABASE_ROUTERS = ['core.replicas.ReplicaRouter']
+
+# Реплики для чтения лент и страниц постов. Локально: выполнить
+# YATUBE_REPLICAS=1 python manage.py sync_replicas, затем runserver
+# с той же переменной окружения.
+REPLICA_DATABASES = ('replica',) if os.environ.get('YATUBE_REPLICAS') else ()
+
+# Сколько секунд после записи пользователь читает с основной базы
+# и ответы, прочитанные с реплики, не кешируются.
+REPLICA_LAG = 5
+
+# Версии лент, кеш страниц и фрагментов, отметки об изменениях лент
+# для реплик и метки индекса существования должны быть общими для всех
+# процессов сервера и команд manage.py, поэтому кеш хранится в файлах,
+# а не в памяти процесса. Тесты пишут в свой каталог.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(
+            BASE_DIR, 'cache_test' if TESTING else 'cache'),
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
     }
 }
 
@@ -116,6 +179,114 @@ STATIC_URL = '/static/'
 
 QUANTITY_OF_POSTS = 10
 
+FEED_CACHE_TIMEOUT = 60 * 15
+
+# Процессный кеш групп и авторов для лент: число записей и TTL в секундах.
+LOOKUP_CACHE_SIZE = 1024
+
+LOOKUP_CACHE_TTL = 60
+
+# Фильтры несуществующих групп, авторов и постов: доля ложных
+# срабатываний, период полного перестроения (между ними заново
+# строится только вид объектов, в который было много записей)
+# и сколько секунд помнить промах в общем кеше.
+EXISTENCE_FILTER_ERROR_RATE = 0.01
+
+EXISTENCE_FILTER_TTL = 60 * 60
+
+NEGATIVE_CACHE_TIMEOUT = 30
+
+# Лента подписок: с какого числа подписчиков посты автора или группы
+# не раскладываются по лентам, а подмешиваются при чтении; сколько
+# последних постов добавить в ленту при подписке; размер пачки вставки.
+TIMELINE_FANOUT_LIMIT = 1000
+
+TIMELINE_BACKFILL = 1000
+
+TIMELINE_BATCH_SIZE = 1000
+
+# Очередь фоновых задач выполняет python manage.py run_workers.
+# При JOBS_EAGER задачи выполняются сразу при постановке в очередь.
+JOBS_EAGER = False
+
+JOBS_WORKERS = 2
+
+# Сколько задач одного типа пакетная задача получает за раз.
+JOBS_BATCH_SIZE = 100
+
+JOBS_POLL_INTERVAL = 1
+
+# Число попыток и задержка перед первым повтором в секундах,
+# каждая следующая вдвое дольше.
+JOBS_MAX_ATTEMPTS = 5
+
+JOBS_RETRY_DELAY = 10
+
+# Через сколько секунд задача упавшего исполнителя возвращается
+# в очередь.
+JOBS_LOCK_TIMEOUT = 300
+
 LEN_OF_POSTS = 15
 
 NUM_POSTS_PAG_TEST = 15
+
+# Сколько запросов к базе допускается на страницу, с учётом
+# авторизованного пользователя и промаха кеша.
+QUERY_BUDGETS = {
+    'posts:main_page': 4,
+    'posts:feed': 2,
+    'posts:group_list': 5,
+    'posts:group_feed': 2,
+    'posts:profile': 6,
+    'posts:profile_feed': 2,
+    'posts:post_detail': 4,
+    'posts:search': 6,
+    'posts:post_create': 8,
+    'posts:post_edit': 9,
+    'posts:follow_index': 5,
+    'posts:profile_follow': 12,
+    'posts:profile_unfollow': 12,
+    'posts:group_follow': 12,
+    'posts:group_unfollow': 12,
+    'about:author': 2,
+    'about:tech': 2,
+}
+
+# С какого числа повторов одного SQL за запрос писать предупреждение.
+QUERY_DUPLICATE_THRESHOLD = 3
+
+# Разбивка времени запроса отдаётся в заголовке Server-Timing каждого
+# ответа и пишется строкой в лог core.timing на уровне INFO, в том числе
+# в рабочем режиме. Остальной core, включая предупреждения о бюджетах
+# запросов core.queries, пишет от WARNING.
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        # В тестах предупреждения проверяются через
+        # core.testing.assert_no_query_warnings, а не в консоли.
+        'console': {
+            'class': ('logging.NullHandler' if TESTING
+                      else 'logging.StreamHandler'),
+        },
+    },
+    'loggers': {
+        'core': {
+            'handlers': ['console'],
+            'level': 'WARNING',
+        },
+        'core.timing': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+        'jobs': {
+            'handlers': ['console'],
+            'level': 'WARNING',
+        },
+        'mail': {
+            'handlers': ['console'],
+            'level': 'WARNING',
+        },
+    },
+}
@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
 
 application = get_wsgi_application()
+
+# Индекс несуществующих объектов строится в фоне, а не в первом запросе.
+from posts.lookups import existence  # noqa: E402
+
+existence.start()